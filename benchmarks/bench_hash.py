@@ -0,0 +1,72 @@
+"""
+Micro-benchmark of the `Mechanism` and `RangeVar` hashes patched in by `nrndiff`, and of
+`Memo.visit`, compared to the previous f-string based hashes.
+"""
+
+import argparse
+import timeit
+
+from neuron import h
+
+from nrndiff import _patches
+from nrndiff._util import Memo
+
+_patches.apply()
+
+
+def _legacy_mech_hash(self):
+    return hash(f"seg:{hash(self.segment())}:mech:{self.name()}")
+
+
+def _legacy_rangevar_hash(self):
+    return hash(f"seg:{hash(self.mech().segment())}:param:{self.name()}")
+
+
+def _legacy_memo_visit(memo, children):
+    for left, right in children:
+        if left not in memo and right not in memo:
+            yield left, right
+        memo.add(left)
+        memo.add(right)
+
+
+def _throughput(f, objs, repeat):
+    best = min(timeit.repeat(lambda: [f(obj) for obj in objs], number=1, repeat=repeat))
+    return len(objs) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nseg", type=int, default=1001)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    sec = h.Section()
+    sec.nseg = args.nseg
+    sec.insert("hh")
+    sec.insert("pas")
+    mechs = [mech for seg in sec for mech in seg]
+    rangevars = [rv for mech in mechs for rv in mech]
+    print(f"{len(mechs)} mechanisms, {len(rangevars)} range variables")
+    for label, objs, legacy, current in (
+        ("Mechanism", mechs, _legacy_mech_hash, _patches._nrnmech_hash),
+        ("RangeVar", rangevars, _legacy_rangevar_hash, _patches._nrnrangevar_hash),
+    ):
+        before = _throughput(legacy, objs, args.repeat)
+        after = _throughput(current, objs, args.repeat)
+        print(
+            f"{label} hash: {before:,.0f}/s before, {after:,.0f}/s after"
+            f" ({after / before:.1f}x)"
+        )
+    pairs = [*zip(rangevars, rangevars[::-1])]
+    before = _throughput(
+        lambda _: [*_legacy_memo_visit(set(), pairs)], [None], args.repeat
+    )
+    after = _throughput(lambda _: [*Memo().visit(pairs)], [None], args.repeat)
+    print(
+        f"Memo.visit: {before * len(pairs):,.0f} pairs/s before,"
+        f" {after * len(pairs):,.0f} pairs/s after ({after / before:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
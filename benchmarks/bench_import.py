@@ -0,0 +1,100 @@
+"""
+Benchmark the startup cost of `import nrndiff`, and of the first diff.
+
+Each import runs in a fresh interpreter, as in a pool of short-lived worker processes,
+and is compared to `import neuron` and to an empty interpreter. The runs also check that
+importing `nrndiff` neither imports NEURON nor creates sections, and the results are
+written as JSON so that runs can be compared over time.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import neuron
+
+import nrndiff
+
+_CASES = {
+    "python": "pass",
+    "import neuron": "import neuron",
+    "import nrndiff": "import nrndiff",
+    "first diff": (
+        "import nrndiff; from neuron import h; "
+        "a, b = h.Section(name='a'), h.Section(name='b'); nrndiff.nrn_diff(a, b)"
+    ),
+}
+
+_CHECK = """
+import sys, nrndiff
+loaded = "neuron" in sys.modules
+from neuron import h
+print(loaded, len(list(h.allsec())))
+"""
+
+
+def _time(code):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def _check():
+    out = subprocess.run(
+        [sys.executable, "-c", _CHECK], check=True, capture_output=True, text=True
+    )
+    loaded, sections = out.stdout.split()
+    return {"imports_neuron": loaded == "True", "sections_created": int(sections)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per case")
+    parser.add_argument("--output", default="bench_import.json")
+    args = parser.parse_args()
+    results = []
+    for case, code in _CASES.items():
+        # Warm up the file system caches before timing.
+        _time(code)
+        times = [_time(code) for _ in range(args.repeat)]
+        results.append(
+            {
+                "case": case,
+                "min": min(times),
+                "median": statistics.median(times),
+                "max": max(times),
+            }
+        )
+        print(
+            f"{case:<15}: {min(times) * 1000:7.1f} ms min, "
+            f"{statistics.median(times) * 1000:7.1f} ms median"
+        )
+    check = _check()
+    print(
+        f"import nrndiff imports neuron: {check['imports_neuron']}, "
+        f"sections created: {check['sections_created']}"
+    )
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "meta": {
+                    "nrndiff": nrndiff.__version__,
+                    "neuron": neuron.__version__,
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                },
+                "check": check,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Count the NEURON calls that `nrn_diff` makes per visited node.
+
+Both models are captured into snapshots, whose proxy objects expose the same API that
+the differs use on live NEURON objects. Every public proxy method or property access is
+counted as one call through the NEURON bridge.
+"""
+
+import argparse
+import collections
+import functools
+
+from neuron import h
+
+from nrndiff import nrn_diff, Snapshot, _differs, _snapshot
+
+_PROXIES = (
+    _snapshot.SnapshotSection,
+    _snapshot.SnapshotSegment,
+    _snapshot.SnapshotMechanism,
+    _snapshot.SnapshotRangeVar,
+)
+
+
+def build_cell(nsec, nseg):
+    secs = [h.Section(name=f"sec{i}") for i in range(nsec)]
+    for i, sec in enumerate(secs[1:], start=1):
+        sec.connect(secs[(i - 1) // 2])
+    for sec in secs:
+        sec.nseg = nseg
+        sec.insert("pas")
+        sec.insert("hh")
+        sec.pt3dadd(0, 0, 0, 1)
+        sec.pt3dadd(10, 0, 0, 1)
+    return secs
+
+
+def _counted(f, key, counts):
+    @functools.wraps(f)
+    def counter(*args, **kwargs):
+        counts[key] += 1
+        return f(*args, **kwargs)
+
+    return counter
+
+
+def instrument(counts, nodes):
+    for cls in _PROXIES:
+        for name, attr in list(vars(cls).items()):
+            if name.startswith("_") and name != "__iter__":
+                continue
+            key = f"{cls.__name__}.{name}"
+            if isinstance(attr, property):
+                setattr(cls, name, property(_counted(attr.fget, key, counts)))
+            elif callable(attr):
+                setattr(cls, name, _counted(attr, key, counts))
+    init = _differs.Differ.__init__
+
+    def counting_init(self, *args, **kwargs):
+        nodes[type(self).__name__] += 1
+        init(self, *args, **kwargs)
+
+    _differs.Differ.__init__ = counting_init
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sections", type=int, default=63)
+    parser.add_argument("--nseg", type=int, default=5)
+    args = parser.parse_args()
+    # Keep the cells referenced, Python sections are deleted when garbage collected.
+    left_cell = build_cell(args.sections, args.nseg)
+    right_cell = build_cell(args.sections, args.nseg)
+    left = Snapshot.capture(left_cell[0])
+    right = Snapshot.capture(right_cell[0])
+    counts = collections.Counter()
+    nodes = collections.Counter()
+    instrument(counts, nodes)
+    nrn_diff(left, right)
+    # Every visited pair of nodes gets a `TypeDiffer` and its own differ.
+    visited = nodes.pop("TypeDiffer")
+    total = sum(counts.values())
+    print(f"nodes visited: {visited}")
+    print(f"NEURON calls: {total} ({total / visited:.2f} per node)")
+    for name, count in counts.most_common():
+        print(f"  {name}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Benchmark `nrn_diff` on synthetic models of several sizes.
+
+Each model is a forest of randomly branching cells with 3D points, `pas` in every
+section and `hh` in a third of them. Every size is diffed as an identical pair, a pair
+with one change and a pair with changes scattered over 1% of the sections. Each case
+runs in its own process, so that its peak RSS can be measured, and the results are
+written as JSON so that runs can be compared over time.
+"""
+
+import argparse
+import collections
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import sys
+import time
+
+import neuron
+from neuron import h
+
+import nrndiff
+from nrndiff import nrn_diff_models, _differences, _differs
+
+# Sections and segments per section of each size.
+SIZES = {
+    100: 51,
+    1000: 11,
+    10000: 3,
+    50000: 1,
+}
+CASES = ("identical", "one-change", "scattered")
+_CELL_SIZE = 1000
+
+
+def build_model(prefix, nsec, nseg, seed=0):
+    """
+    Build a forest of cells with `nsec` sections in total. The same seed builds the same
+    model.
+    """
+    rng = random.Random(seed)
+    secs = []
+    for cell in range(0, nsec, _CELL_SIZE):
+        ncell = min(_CELL_SIZE, nsec - cell)
+        cell_secs = [
+            h.Section(name=f"{prefix}{cell // _CELL_SIZE}.sec{i}") for i in range(ncell)
+        ]
+        for i, sec in enumerate(cell_secs[1:], start=1):
+            # Attach to one of the recent sections, for a tree of random depth.
+            sec.connect(cell_secs[rng.randrange(max(0, i - 8), i)])
+        for i, sec in enumerate(cell_secs):
+            sec.nseg = nseg
+            sec.insert("pas")
+            if i % 3 == 0:
+                sec.insert("hh")
+            length = rng.uniform(10, 200)
+            diam = rng.uniform(0.5, 3)
+            sec.pt3dadd(0, 0, 0, diam)
+            sec.pt3dadd(length / 2, rng.uniform(-5, 5), 0, diam)
+            sec.pt3dadd(length, 0, 0, diam)
+        secs.extend(cell_secs)
+    return secs
+
+
+def apply_case(secs, case, seed=0):
+    """
+    Modify a model for the given case, and return the number of changed sections.
+    """
+    if case == "identical":
+        return 0
+    if case == "one-change":
+        secs[-1](0.5).g_pas *= 2
+        return 1
+    rng = random.Random(seed)
+    changed = rng.sample(secs, max(1, len(secs) // 100))
+    for i, sec in enumerate(changed):
+        if i % 2:
+            sec.Ra *= 2
+        else:
+            sec(0.5).g_pas *= 2
+    return len(changed)
+
+
+def _peak_rss():
+    # `ru_maxrss` is in kilobytes on Linux, but in bytes on macOS.
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _instrument(counts):
+    differ_init = _differs.Differ.__init__
+    difference_init = _differences.Difference.__init__
+
+    def counting_differ_init(self, *args, **kwargs):
+        counts[type(self).__name__] += 1
+        differ_init(self, *args, **kwargs)
+
+    def counting_difference_init(self, *args, **kwargs):
+        counts["differences"] += 1
+        difference_init(self, *args, **kwargs)
+
+    _differs.Differ.__init__ = counting_differ_init
+    _differences.Difference.__init__ = counting_difference_init
+
+
+def run_case(nsec, nseg, case, counted):
+    # Keep the sections referenced, Python sections are deleted when garbage collected.
+    left = build_model("left", nsec, nseg)
+    right = build_model("right", nsec, nseg)
+    changed = apply_case(right, case)
+    counts = collections.Counter()
+    if counted:
+        _instrument(counts)
+    rss = _peak_rss()
+    start = time.perf_counter()
+    diffs = nrn_diff_models(left, right)
+    wall = time.perf_counter() - start
+    return {
+        "wall": wall,
+        "rss_before": rss,
+        "peak_rss": _peak_rss(),
+        "changed_sections": changed,
+        "differences_reported": len(diffs),
+        # Every visited pair of nodes gets a `TypeDiffer` and its own differ.
+        "nodes_visited": counts["TypeDiffer"],
+        "differences_created": counts["differences"],
+    }
+
+
+def _run_isolated(*args):
+    with multiprocessing.get_context("fork").Pool(1, maxtasksperchild=1) as pool:
+        return pool.apply(run_case, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[*SIZES], help="Numbers of sections"
+    )
+    parser.add_argument(
+        "--nseg", type=int, help="Segments per section, by default 51 down to 1"
+    )
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=[*CASES])
+    parser.add_argument("--output", default="bench_suite.json")
+    args = parser.parse_args()
+    results = []
+    for nsec in args.sizes:
+        nseg = args.nseg or SIZES.get(nsec, 1)
+        for case in args.cases:
+            # Time without instrumentation, and count the nodes in a separate run.
+            result = _run_isolated(nsec, nseg, case, False)
+            counted = _run_isolated(nsec, nseg, case, True)
+            result["nodes_visited"] = counted["nodes_visited"]
+            result["differences_created"] = counted["differences_created"]
+            result.update(sections=nsec, nseg=nseg, case=case)
+            results.append(result)
+            print(
+                f"{nsec:>6} sections, nseg {nseg:>2}, {case:<10}: "
+                f"{result['wall']:8.3f}s, {result['peak_rss'] / 2**20:7.1f} MiB, "
+                f"{result['nodes_visited']} nodes, "
+                f"{result['differences_created']} differences created, "
+                f"{result['differences_reported']} reported"
+            )
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "meta": {
+                    "nrndiff": nrndiff.__version__,
+                    "neuron": neuron.__version__,
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                },
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+
+
+if __name__ == "__main__":
+    main()
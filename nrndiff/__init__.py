@@ -1,23 +1,166 @@
 """
 NEURON object differ. Recursively finds differences between objects in NEURON.
 """
+
 import gc
-from typing import List, TYPE_CHECKING
+import importlib
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple, Type, Union, TYPE_CHECKING
 from collections import deque
-from . import _patches
-from ._differs import TypeDiffer as _TypeDiffer, get_differ_for
-from ._util import Memo
 
 __version__ = "0.0.3"
-__all__ = ["nrn_diff", "get_differ_for"]
+__all__ = [
+    "nrn_diff",
+    "iter_diff",
+    "nrn_diff_bulk",
+    "nrn_diff_many",
+    "nrn_diff_parallel",
+    "nrn_diff_distributed",
+    "nrn_diff_simulation",
+    "get_differ_for",
+    "nrn_diff_models",
+    "Snapshot",
+    "DigestCache",
+    "DiffCache",
+    "Model",
+    "CellMap",
+    "Connectivity",
+    "DiffStats",
+    "DiffRecord",
+    "DiffReport",
+    "DiffSession",
+    "DiffMatrix",
+    "Divergence",
+]
+
+# NEURON is only imported, and patched, when the first diff needs it, so the public
+# classes are imported from their modules on first access.
+_LAZY = {
+    "get_differ_for": "_differs",
+    "Snapshot": "_snapshot",
+    "DigestCache": "_digest",
+    "DiffCache": "_cache",
+    "Model": "_models",
+    "CellMap": "_models",
+    "Connectivity": "_models",
+    "DiffStats": "_stats",
+    "DiffRecord": "_records",
+    "DiffReport": "_report",
+    "DiffSession": "_session",
+    "DiffMatrix": "_many",
+    "Divergence": "_lockstep",
+}
+
+
+def __getattr__(name):
+    try:
+        module = _LAZY[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_LAZY})
 
 
 if TYPE_CHECKING:
+    from ._cache import DiffCache
     from ._differences import Difference
+    from ._lockstep import Divergence
+    from ._many import DiffMatrix
+    from ._records import DiffRecord
+    from ._report import DiffReport
+    from ._stats import DiffStats
+
+
+def nrn_diff(
+    left,
+    right,
+    digests=None,
+    stats: Optional["DiffStats"] = None,
+    compact: bool = False,
+    cache: Optional["DiffCache"] = None,
+) -> Union["DiffReport", List["DiffRecord"]]:
+    """
+    Find all differences between `left` and `right`. See :func:`iter_diff` for the
+    arguments.
 
+    :returns: A :class:`DiffReport` of the differences, which records their values and
+      indexes them by type, section, cell, mechanism and parameter.
 
-def nrn_diff(left, right) -> List["Difference"]:
-    diff_bag = []
+    :param compact: Return a :class:`DiffRecord` of each difference instead, which holds
+      no references to the compared objects. ``record.to_difference(left, right)``
+      turns a record back into a `Difference`.
+    :param cache: A :class:`DiffCache` to look up the differences of sections and
+      models in, keyed by the digests of each pair of root sections and the sources of
+      the mechanisms. Pairs that aren't cached are diffed with `digests`, or new digest
+      caches, and stored.
+    """
+    from . import _cache
+    from ._records import DiffRecord, children_cache as _children_cache
+    from ._report import DiffReport
+
+    if cache is not None:
+        diff_bag = _cache.diff(left, right, cache, digests=digests, stats=stats)
+        if compact:
+            children = _children_cache()
+            return [DiffRecord.from_difference(diff, children) for diff in diff_bag]
+        return DiffReport(diff_bag)
+    if compact:
+        children = _children_cache()
+        return [
+            DiffRecord.from_difference(diff, children)
+            for diff in iter_diff(left, right, digests=digests, stats=stats)
+        ]
+    diff_bag = DiffReport(iter_diff(left, right, digests=digests, stats=stats))
+    if stats is None:
+        gc.collect()
+    else:
+        start = time.perf_counter()
+        gc.collect()
+        stats.gc_time += time.perf_counter() - start
+    return diff_bag
+
+
+def iter_diff(
+    left,
+    right,
+    max_diffs: Optional[int] = None,
+    stop_on_first: bool = False,
+    types: Union[Type["Difference"], Tuple[Type["Difference"], ...], None] = None,
+    digests=None,
+    stats: Optional["DiffStats"] = None,
+) -> Iterator["Difference"]:
+    """
+    Lazily yield the differences between `left` and `right` as the walk finds them.
+
+    :param max_diffs: Stop the walk after this many differences have been yielded.
+    :param stop_on_first: Stop the walk at the first difference.
+    :param types: Only yield differences of these types. The walk itself is unaffected.
+    :param digests: Skip section pairs with identical subtree digests. ``True`` computes
+      new digests, or pass a :class:`DigestCache` to reuse for both sides, or a pair of
+      caches, such as ``(reference_cache, None)``, to reuse the digests of one side.
+    :param stats: A :class:`DiffStats` to fill in with statistics of the walk.
+    """
+    from ._differs import TypeDiffer as _TypeDiffer, get_differ_for
+    from ._digest import (
+        get_digest_caches as _get_digest_caches,
+        subtrees_match as _subtrees_match,
+    )
+    from ._snapshot import coerce_pair as _coerce_pair
+    from ._util import Memo
+
+    if stop_on_first:
+        max_diffs = 1
+    if max_diffs is not None and max_diffs <= 0:
+        return
+    yielded = 0
+    digest_caches = _get_digest_caches(digests)
+    # Snapshots can only be compared to snapshots, so capture the live side if needed.
+    left, right = _coerce_pair(left, right)
     memo = Memo({left, right})
     # The stack starts with a node of the given arguments and no parent differ.
     stack = deque([(left, right, None)])
@@ -27,27 +170,179 @@ def nrn_diff(left, right) -> List["Difference"]:
             left, right, parent = stack.pop()
         except IndexError:
             break
+        # Identical subtrees contain no differences, so don't walk them.
+        if digest_caches and (
+            _subtrees_match(digest_caches, left, right)
+            if stats is None
+            else stats._subtrees_match(digest_caches, left, right)
+        ):
+            continue
+        if stats is not None:
+            stats._enter(left, right, parent)
         # Check if there is a difference between the types.
-        type_diffs = _TypeDiffer(left, right, parent).get_diff()
-        diff_bag.extend(type_diffs)
+        type_differ = _TypeDiffer(left, right, parent)
+        type_diffs = (
+            type_differ.get_diff() if stats is None else stats._evaluate(type_differ)
+        )
+        diffs = type_diffs
+        differ = None
         # If there is no type nrn_diff, or it's not a drastic type nrn_diff, check for normal nrn_diff
         if not type_diffs or all(diff.continue_diff() for diff in type_diffs):
             # See if there is a differ defined for this type, if not, skip this node
             differ_type = get_differ_for(left)
-            if not differ_type:
-                continue
-            differ = differ_type(left, right, parent)
-            # Get and store the list of differences between the objects
-            diffs = differ.get_diff()
-            diff_bag.extend(diffs)
-            # No diffs that terminate diffing?
-            if all(diff.continue_diff() for diff in diffs):
-                # Then extend the stack with all the NEURON objects related to this pair
-                # that we haven't visited yet, and add them to the memo.
-                stack.extend(
-                    (left_child, right_child, differ)
-                    for (left_child, right_child) in memo.visit(differ.get_children())
+            if differ_type:
+                differ = differ_type(left, right, parent)
+                # Get the list of differences between the objects
+                diffs = type_diffs + (
+                    differ.get_diff() if stats is None else stats._evaluate(differ)
                 )
-    del memo
-    gc.collect()
-    return diff_bag
+                # No diffs that terminate diffing?
+                if all(diff.continue_diff() for diff in diffs):
+                    # Then extend the stack with all the NEURON objects related to this
+                    # pair that we haven't visited yet, and add them to the memo.
+                    stack.extend(
+                        (left_child, right_child, differ)
+                        for (left_child, right_child) in (
+                            memo.visit(differ.get_children())
+                            if stats is None
+                            else stats._visit(memo, differ)
+                        )
+                    )
+        if stats is not None:
+            stats._exit(left, right, differ, diffs, len(memo), len(stack))
+        for diff in diffs:
+            if types is None or isinstance(diff, types):
+                yield diff
+                yielded += 1
+                if max_diffs is not None and yielded >= max_diffs:
+                    return
+
+
+def nrn_diff_models(left, right, **kwargs) -> Union["DiffReport", List["DiffRecord"]]:
+    """
+    Diff two complete models in a single walk. The models can be given as iterables of
+    sections, such as ``h.allsec()``, as snapshots or as :class:`Model` indices. Their
+    root sections are matched by name and then by structural signature, and the matched
+    subtrees are diffed with a shared memo. Unmatched roots are reported as a
+    `ModelRootDifference`. Keyword arguments are passed to :func:`nrn_diff`.
+    """
+    from ._models import Model
+    from ._snapshot import Snapshot, coerce_pair as _coerce_pair
+
+    left, right = (
+        model.source if isinstance(model, Model) else model for model in (left, right)
+    )
+    left, right = (
+        model if isinstance(model, Snapshot) else [*model] for model in (left, right)
+    )
+    left, right = _coerce_pair(left, right)
+    return nrn_diff(Model(left), Model(right), **kwargs)
+
+
+def nrn_diff_many(reference, variants: Iterable, digests: bool = True) -> "DiffMatrix":
+    """
+    Diff many variants against one reference, such as the models of a parameter sweep.
+    The reference and the variants can be sections, snapshots, :class:`Model` indices
+    or iterables of sections, which are indexed as a :class:`Model`. The reference is
+    indexed once, and its subtree digests are computed once and reused to skip the
+    subtrees of each variant that are identical to it.
+
+    :param digests: Skip identical subtrees, see :func:`iter_diff`.
+    :returns: A :class:`DiffMatrix` of the variants by the difference sites.
+    """
+    from . import _many
+
+    return _many.diff(reference, variants, digests=digests)
+
+
+def nrn_diff_bulk(left, right) -> "DiffReport":
+    """
+    Vectorized alternative to :func:`nrn_diff` for sections and snapshots. All compared
+    values are captured into arrays in one pass per side, and only the differing indices
+    produce `Difference` objects, of the same types as :func:`nrn_diff` returns. Other
+    objects, and sections with point processes, are diffed with :func:`nrn_diff`.
+    """
+    from . import _bulk
+    from ._report import DiffReport
+    from ._snapshot import coerce_pair as _coerce_pair
+
+    left, right = _coerce_pair(left, right)
+    if not _bulk.supports(left, right):
+        return nrn_diff(left, right)
+    return DiffReport(_bulk.BulkDiff(left, right).get_diff())
+
+
+def nrn_diff_parallel(
+    left, right, max_workers: Optional[int] = None, chunksize: Optional[int] = None
+) -> "DiffReport":
+    """
+    Diff two complete models in a pool of processes. The models can be given as
+    iterables of sections, snapshots or :class:`Model` indices, and live models are
+    captured as snapshots first. The root sections are matched as in
+    :func:`nrn_diff_models`, and each pair of matched cells is diffed in a worker.
+
+    The differences are returned as a :class:`DiffReport`, per pair of cells, in the
+    order of the matched roots, and refer to the objects of the snapshots.
+
+    :param max_workers: Number of worker processes, by default the number of CPUs.
+    :param chunksize: Number of cells sent to a worker at once.
+    """
+    from . import _parallel
+    from ._report import DiffReport
+
+    return DiffReport(
+        _parallel.diff(left, right, max_workers=max_workers, chunksize=chunksize)
+    )
+
+
+def nrn_diff_distributed(
+    left, right, pc=None
+) -> Tuple[bool, Optional[List[Tuple[Optional[int], "DiffRecord"]]]]:
+    """
+    Diff a parallel network, of which each rank owns some of the cells. Call it on every
+    rank, with the cells that the rank owns on each side, given as mappings of gids to
+    cells or as :class:`CellMap` objects. Cells are paired by gid, and a gid that exists
+    on only one side of a rank is reported as a `GidDifference`.
+
+    :param pc: The ``h.ParallelContext`` to communicate over.
+    :returns: Whether the networks are identical on all ranks, and on rank 0 the
+      `(gid, record)` pairs of all differences, sorted by gid, or ``None`` on the other
+      ranks. The gid of a `GidDifference` is ``None``. The records can be turned back
+      into differences with the cell maps of the rank that found them.
+    """
+    from . import _distributed
+
+    return _distributed.diff(left, right, pc=pc)
+
+
+def nrn_diff_simulation(
+    left,
+    right,
+    tstop: float,
+    interval: Optional[float] = None,
+    v_init: Optional[float] = None,
+    rtol: float = 1e-05,
+    atol: float = 1e-08,
+) -> Optional["Divergence"]:
+    """
+    Simulate two live models in lockstep, from ``h.finitialize`` up to `tstop`, and stop
+    at the first check where the membrane potential or a mechanism state of any pair of
+    segments differs beyond the tolerance. The models are given as sections or
+    iterables of sections, and their sections are matched as in
+    :func:`nrn_diff_models`. Sections with a different number of segments aren't
+    compared, use :func:`nrn_diff_models` to find structural differences.
+
+    :param interval: Time between checks, in ms. By default, the states are checked
+      after every time step.
+    :param v_init: Initial membrane potential, in mV. By default ``h.v_init`` if the
+      standard run system is loaded, otherwise -65 mV.
+    :param rtol: Relative tolerance, see `numpy.isclose`.
+    :param atol: Absolute tolerance, see `numpy.isclose`.
+    :returns: The diverged states at the first check where any diverged, or ``None``
+      if the models didn't diverge before `tstop`.
+    """
+    from . import _lockstep
+
+    return _lockstep.diff(
+        left, right, tstop, interval=interval, v_init=v_init, rtol=rtol, atol=atol
+    )
@@ -0,0 +1,333 @@
+"""
+Vectorized bulk diff engine.
+
+Both sides are captured into snapshot arrays in one pass, compared column by column, and
+`Difference` objects are only created for the indices that differ. The traversal rules
+of `nrn_diff` are mirrored: pairs whose discretization, 3D points or number of children
+differ are not descended into, and mechanisms whose source differs are not compared
+parameter by parameter. Point processes aren't captured, so live sections with point
+processes are left to `nrn_diff`.
+"""
+
+import numpy as _np
+from . import _differences, _differs
+from ._models import match_keyed
+from ._util import ranges
+from ._snapshot import (
+    Snapshot,
+    SnapshotSection,
+    SnapshotSegment,
+    capture_arrays,
+    has_point_processes,
+    order_sections,
+)
+from neuron import nrn as _nrn
+
+_SECTION_DIFFERENCES = (
+    _differences.SectionLengthDifference,
+    _differences.SectionDiamDifference,
+    _differences.SectionAxialResistanceDifference,
+    _differences.SectionMembraneCapacitanceDifference,
+    _differences.SectionMembranePotentialDifference,
+    _differences.SectionDiscretizationDifference,
+)
+_SEGMENT_DIFFERENCES = (
+    _differences.SegmentXDifference,
+    _differences.SegmentAreaDifference,
+    _differences.SegmentVolumeDifference,
+    _differences.SegmentInputResistanceDifference,
+    _differences.SegmentPotentialDifference,
+)
+
+
+def supports(left, right):
+    if isinstance(left, Snapshot) and isinstance(right, Snapshot):
+        return True
+    # Point processes aren't captured in the arrays, `nrn_diff` compares them instead.
+    return (
+        isinstance(left, _nrn.Section)
+        and isinstance(right, _nrn.Section)
+        and not has_point_processes(left.subtree())
+        and not has_point_processes(right.subtree())
+    )
+
+
+class _Model:
+    def __init__(self, obj):
+        if isinstance(obj, Snapshot):
+            self.snapshot = obj
+            self._live = None
+        else:
+            self._live = order_sections(obj)
+            self.snapshot = Snapshot(capture_arrays(self._live))
+        self._segments = {}
+
+    def __getitem__(self, key):
+        return self.snapshot[key]
+
+    @property
+    def roots(self):
+        return _np.flatnonzero(self.snapshot["sec.parent"] < 0).tolist()
+
+    def section(self, i):
+        if self._live is None:
+            return SnapshotSection(self.snapshot, i)
+        return self._live[i]
+
+    def segment(self, sec_id, seg_id):
+        if self._live is None:
+            return SnapshotSegment(self.snapshot, seg_id)
+        try:
+            segments = self._segments[sec_id]
+        except KeyError:
+            segments = self._segments[sec_id] = [*self._live[sec_id]]
+        return segments[seg_id - self.snapshot["seg.offset"][sec_id]]
+
+
+class BulkDiff:
+    def __init__(self, left, right):
+        self._root = (left, right)
+        self._left = _Model(left)
+        self._right = _Model(right)
+        self._differs = {}
+
+    def get_diff(self):
+        diffs = []
+        root_differ = None
+        roots = [*zip(self._left.roots, self._right.roots)]
+        if isinstance(self._root[0], Snapshot):
+            # Match the roots like `SnapshotDiffer` does.
+            root_differ = _differs.SnapshotDiffer(*self._root, None)
+            diffs.extend(root_differ.get_diff())
+            roots = [(l._index, r._index) for l, r in root_differ.get_children()]
+        pairs = self._pair_sections(roots)
+        self._sec_pairs = pairs
+        self._root_differ = root_differ
+        descend = self._diff_sections(pairs, diffs)
+        segs = self._diff_segments(pairs, descend, diffs)
+        self._diff_mechanisms(segs, diffs)
+        return diffs
+
+    def _pair_sections(self, roots):
+        # Match child sections like `SectionDiffer.get_children`.
+        lchildren, lnames, lsigs = self._child_index(self._left)
+        rchildren, rnames, rsigs = self._child_index(self._right)
+        keys = [
+            (lnames.__getitem__, rnames.__getitem__),
+            (lsigs.__getitem__, rsigs.__getitem__),
+        ]
+        left, right, parent = [], [], []
+        for l, r in roots:
+            left.append(l)
+            right.append(r)
+            parent.append(-1)
+        p = 0
+        while p < len(left):
+            lc, rc = lchildren[left[p]], rchildren[right[p]]
+            if [lnames[c] for c in lc] == [rnames[c] for c in rc]:
+                matched = zip(lc, rc)
+            else:
+                matched, _, _ = match_keyed(lc, rc, keys)
+            for l, r in matched:
+                left.append(l)
+                right.append(r)
+                parent.append(p)
+            p += 1
+        return (
+            _np.array(left, dtype=_np.int64),
+            _np.array(right, dtype=_np.int64),
+            _np.array(parent, dtype=_np.int64),
+        )
+
+    def _child_index(self, model):
+        children = model["sec.children"].tolist()
+        offset = model["sec.children.offset"].tolist()
+        names = [name.rsplit(".", 1)[-1] for name in model["sec.name"].tolist()]
+        sigs = [
+            *zip(
+                model["sec.nseg"].tolist(),
+                _np.diff(model["pt3d.offset"]).tolist(),
+                _np.diff(model["sec.children.offset"]).tolist(),
+            )
+        ]
+        return (
+            [children[start:stop] for start, stop in zip(offset, offset[1:])],
+            names,
+            sigs,
+        )
+
+    def _diff_sections(self, pairs, diffs):
+        li, ri, parent = pairs
+        L, R = self._left, self._right
+        masks = {
+            cls: L[f"sec.{cls._attr}"][li] != R[f"sec.{cls._attr}"][ri]
+            for cls in _SECTION_DIFFERENCES
+        }
+        masks[_differences.SectionPointDifference] = self._diff_points(li, ri)
+        lcount = _np.diff(L["sec.children.offset"])[li]
+        rcount = _np.diff(R["sec.children.offset"])[ri]
+        masks[_differences.SectionChildrenDifference] = lcount != rcount
+        halt = (
+            masks[_differences.SectionDiscretizationDifference]
+            | masks[_differences.SectionPointDifference]
+            | masks[_differences.SectionChildrenDifference]
+        )
+        # A pair is only visited if its parent pair was visited and could be descended.
+        reached = _np.ones(len(li), dtype=bool)
+        for p, pp in enumerate(parent.tolist()):
+            if pp >= 0:
+                reached[p] = reached[pp] and not halt[pp]
+        for p in _np.flatnonzero(reached & _np.any([*masks.values()], axis=0)).tolist():
+            differ = self._section_differ(p)
+            diffs.extend(
+                self._difference(cls, differ, "sec", li[p], ri[p])
+                for cls, mask in masks.items()
+                if mask[p]
+            )
+        return reached & ~halt
+
+    def _diff_points(self, li, ri):
+        L, R = self._left, self._right
+        lstart, rstart = L["pt3d.offset"][li], R["pt3d.offset"][ri]
+        lcount = L["pt3d.offset"][li + 1] - lstart
+        rcount = R["pt3d.offset"][ri + 1] - rstart
+        different = lcount != rcount
+        same = _np.flatnonzero(~different)
+        counts = lcount[same]
+        lpts = L["pt3d"][ranges(lstart[same], counts)]
+        rpts = R["pt3d"][ranges(rstart[same], counts)]
+        point = _differences.SectionPointDifference
+        mismatch = ~_np.isclose(lpts, rpts, rtol=point.rtol, atol=point.atol).all(
+            axis=1
+        )
+        pair = _np.repeat(_np.arange(len(same)), counts)
+        different[same] = _np.bincount(pair, weights=mismatch, minlength=len(same)) > 0
+        return different
+
+    def _diff_segments(self, pairs, descend, diffs):
+        li, ri, _ = pairs
+        L, R = self._left, self._right
+        sec_pair = _np.flatnonzero(descend)
+        nseg = L["sec.nseg"][li[sec_pair]]
+        lseg = ranges(L["seg.offset"][li[sec_pair]], nseg)
+        rseg = ranges(R["seg.offset"][ri[sec_pair]], nseg)
+        sec_pair = _np.repeat(sec_pair, nseg)
+        masks = {
+            cls: L[f"seg.{cls._attr}"][lseg] != R[f"seg.{cls._attr}"][rseg]
+            for cls in _SEGMENT_DIFFERENCES
+        }
+        names = sorted({*L["mech.name"].tolist(), *R["mech.name"].tolist()})
+        lpresent = self._present(L, names, lseg)
+        rpresent = self._present(R, names, rseg)
+        mech_diff = (lpresent != rpresent).any(axis=1)
+        masks[_differences.SegmentMechanismDifference] = mech_diff
+        segs = (sec_pair, lseg, rseg)
+        for s in _np.flatnonzero(_np.any([*masks.values()], axis=0)).tolist():
+            differ = self._segment_differ(segs, s)
+            diffs.extend(
+                self._difference(cls, differ, "seg", lseg[s], rseg[s])
+                for cls, mask in masks.items()
+                if mask[s]
+            )
+        return segs, names, lpresent & ~mech_diff[:, None]
+
+    def _difference(self, cls, differ, prefix, l, r):
+        diff = cls(differ)
+        if issubclass(cls, _differences.AttributeDifference):
+            # Attribute values are already in the arrays, don't fetch them again.
+            key = f"{prefix}.{cls._attr}"
+            diff._seed((self._left[key][l].item(), self._right[key][r].item()))
+        return diff
+
+    def _present(self, model, names, segs):
+        present = _np.zeros((len(segs), len(names)), dtype=bool)
+        cols = [names.index(name) for name in model["mech.name"].tolist()]
+        present[:, cols] = model["mech.present"][segs]
+        return present
+
+    def _diff_mechanisms(self, segs, diffs):
+        segs, names, present = segs
+        _, lseg, rseg = segs
+        L, R = self._left, self._right
+        lfiles = dict(zip(L["mech.name"].tolist(), L["mech.file"].tolist()))
+        rfiles = dict(zip(R["mech.name"].tolist(), R["mech.file"].tolist()))
+        for m, name in enumerate(names):
+            rows = _np.flatnonzero(present[:, m])
+            if not len(rows):
+                continue
+            if lfiles[name] != rfiles[name]:
+                for s in rows.tolist():
+                    diffs.append(
+                        _differences.SourceDifference(self._mech_differ(segs, s, name))
+                    )
+                continue
+            # Parameters are paired in order, like `MechanismDiffer` does.
+            for k, ((lv, _), (rv, _)) in enumerate(
+                zip(self._vars(L, name), self._vars(R, name))
+            ):
+                lcols = _np.arange(*L["var.offset"][lv : lv + 2])
+                rcols = _np.arange(*R["var.offset"][rv : rv + 2])
+                lvals = L["var.values"][_np.ix_(lseg[rows], lcols)]
+                rvals = R["var.values"][_np.ix_(rseg[rows], rcols)]
+                if len(lcols) == len(rcols):
+                    mask = _differences._values_differ(lvals, rvals).any(axis=1)
+                else:
+                    mask = _np.ones(len(rows), dtype=bool)
+                for s in _np.flatnonzero(mask).tolist():
+                    mech_differ = self._mech_differ(segs, int(rows[s]), name)
+                    lrv = [*mech_differ.left][k]
+                    rrv = [*mech_differ.right][k]
+                    diff = _differences.ParameterDifference(
+                        _differs.ParameterDiffer(lrv, rrv, mech_differ)
+                    )
+                    diff._seed((_value(lvals[s]), _value(rvals[s])))
+                    diffs.append(diff)
+
+    def _vars(self, model, name):
+        mech = model["mech.name"].tolist().index(name)
+        return [
+            (i, var)
+            for i, (m, var) in enumerate(
+                zip(model["var.mech"].tolist(), model["var.name"].tolist())
+            )
+            if m == mech
+        ]
+
+    def _section_differ(self, p):
+        key = ("sec", p)
+        if key not in self._differs:
+            li, ri, parent = self._sec_pairs
+            pp = parent[p]
+            self._differs[key] = _differs.SectionDiffer(
+                self._left.section(li[p]),
+                self._right.section(ri[p]),
+                self._section_differ(pp) if pp >= 0 else self._root_differ,
+            )
+        return self._differs[key]
+
+    def _segment_differ(self, segs, s):
+        key = ("seg", s)
+        if key not in self._differs:
+            sec_pair, lseg, rseg = segs
+            p = sec_pair[s]
+            li, ri, _ = self._sec_pairs
+            self._differs[key] = _differs.SegmentDiffer(
+                self._left.segment(li[p], lseg[s]),
+                self._right.segment(ri[p], rseg[s]),
+                self._section_differ(p),
+            )
+        return self._differs[key]
+
+    def _mech_differ(self, segs, s, name):
+        key = ("mech", s, name)
+        if key not in self._differs:
+            parent = self._segment_differ(segs, s)
+            self._differs[key] = _differs.MechanismDiffer(
+                getattr(parent.left, name), getattr(parent.right, name), parent
+            )
+        return self._differs[key]
+
+
+def _value(row):
+    # Like `get_value`, scalars for single values and arrays for array variables.
+    return float(row[0]) if len(row) == 1 else row
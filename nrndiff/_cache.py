@@ -0,0 +1,181 @@
+"""
+Persistent cache of diffs, keyed by content fingerprints of the compared models.
+
+Models are diffed per pair of matched root sections, and the differences of each pair
+are stored as `DiffRecord`s under the subtree digests of both roots and the source
+files of the mechanisms. Unchanged pairs are restored from the cache without a walk,
+and in the changed pairs only the subtrees with changed digests are walked.
+"""
+
+import hashlib as _hashlib
+import os as _os
+import pathlib as _pathlib
+import pickle as _pickle
+import tempfile as _tempfile
+import neuron as _neuron
+from neuron import h as _h
+from ._differs import ModelDiffer, SnapshotDiffer
+from ._digest import DigestCache, get_digest_caches
+from ._models import Model
+from ._records import DiffRecord, children_cache
+from ._snapshot import Snapshot, SnapshotSection, coerce_pair
+
+# Bump when the walk or the records change, to invalidate the entries of older versions.
+_FORMAT = 2
+
+
+class DiffCache:
+    """
+    Cache of diffs in a local directory, shared between processes and runs. Pass it as
+    the `cache` argument of :func:`~nrndiff.nrn_diff`. When the entries exceed
+    `max_size`, the least recently used entries are evicted.
+
+    :param directory: Directory of the entries, created if it doesn't exist.
+    :param max_size: Maximum total size of the entries, in bytes.
+    """
+
+    def __init__(self, directory, max_size=256 * 2**20):
+        self.directory = _pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return (
+            f"<DiffCache in '{self.directory}', {self.hits} hits, {self.misses} misses>"
+        )
+
+    def _path(self, key):
+        return self.directory / f"{key}.pickle"
+
+    def get(self, key):
+        """
+        Get the records stored under `key`, or ``None``.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                records = _pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (_pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # A broken or outdated entry, drop it.
+            _unlink(path)
+            self.misses += 1
+            return None
+        # The modification time tracks the last use, for the eviction.
+        _os.utime(path)
+        self.hits += 1
+        return records
+
+    def put(self, key, records):
+        """
+        Store records under `key`, and evict the least recently used entries if the
+        cache is full.
+        """
+        # Write to a temporary file first, so that other processes never read a partial
+        # entry.
+        fd, tmp = _tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with open(fd, "wb") as f:
+            _pickle.dump(records, f, protocol=_pickle.HIGHEST_PROTOCOL)
+        _os.replace(tmp, self._path(key))
+        self._evict()
+
+    def clear(self):
+        for path in self.directory.glob("*.pickle"):
+            _unlink(path)
+
+    def _evict(self):
+        entries = []
+        for path in self.directory.glob("*.pickle"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            _unlink(path)
+            size -= entry_size
+
+
+def _unlink(path):
+    # Entries may be removed by other processes at the same time.
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def diff(left, right, cache, digests=None, stats=None):
+    from . import iter_diff
+
+    left, right = coerce_pair(left, right)
+    if isinstance(left, Model) and isinstance(right, Model):
+        differ = ModelDiffer(left, right, None)
+    elif isinstance(left, Snapshot) and isinstance(right, Snapshot):
+        differ = SnapshotDiffer(left, right, None)
+    elif _is_section(left) and _is_section(right):
+        differ = None
+    else:
+        # Only models and sections can be fingerprinted.
+        return [*iter_diff(left, right, digests=digests, stats=stats)]
+    if differ is None:
+        diffs, pairs = [], [(left, right)]
+    else:
+        diffs, pairs = differ.get_diff(), differ.get_children()
+    digests = get_digest_caches(digests) or (DigestCache(), DigestCache())
+    mechanisms = _get_mechanisms_fingerprint()
+    for lroot, rroot in pairs:
+        hasher = _hashlib.blake2b(mechanisms, digest_size=20)
+        hasher.update(digests[0].digest(lroot))
+        hasher.update(digests[1].digest(rroot))
+        key = hasher.hexdigest()
+        records = cache.get(key)
+        if records is None:
+            children = children_cache()
+            # The digests skip the subtrees that are identical, so only the changed
+            # sections are walked.
+            records = [
+                DiffRecord.from_difference(difference, children)
+                for difference in iter_diff(lroot, rroot, digests=digests, stats=stats)
+            ]
+            cache.put(key, records)
+        diffs.extend(DiffRecord.to_differences(records, lroot, rroot, differ))
+    return diffs
+
+
+def _is_section(obj):
+    return isinstance(obj, (_neuron.nrn.Section, SnapshotSection))
+
+
+def _get_mechanisms_fingerprint():
+    """
+    Fingerprint of the source files of the loaded mechanisms, and of the versions that
+    produce the diff.
+    """
+    from . import __version__
+
+    hasher = _hashlib.blake2b(digest_size=20)
+    hasher.update(f"{_FORMAT}:{__version__}:{_neuron.__version__}\0".encode())
+    types = _h.MechanismType(0)
+    name = _h.ref("")
+    for i in range(int(types.count())):
+        types.select(i)
+        types.selected(name)
+        try:
+            path = getattr(_h, name[0]).file
+        except TypeError:
+            # Internal mechanisms, such as `morphology`, have no source.
+            continue
+        hasher.update(f"{name[0]}:{path}\0".encode())
+        # The source may have changed since the entries were stored, so hash its content
+        # if it's available.
+        if path and _os.path.isfile(path):
+            with open(path, "rb") as f:
+                hasher.update(_hashlib.blake2b(f.read(), digest_size=20).digest())
+    return hasher.digest()
@@ -0,0 +1,159 @@
+"""
+The ``nrn-diff`` command: diff two model scripts or snapshots, and stream each
+difference as a line of JSON.
+
+Model scripts, Python or HOC, are each run in a separate process, and the sections they
+create are captured into a snapshot, so that two scripts can't interfere through names,
+templates or global state. NEURON is only imported in the workers once they run from
+the directory of their script, so that the mechanisms compiled there are loaded.
+"""
+
+import argparse as _argparse
+import collections as _collections
+import concurrent.futures as _futures
+import json as _json
+import multiprocessing as _multiprocessing
+import os as _os
+import pathlib as _pathlib
+import runpy as _runpy
+import sys as _sys
+import tempfile as _tempfile
+import numpy as _np
+
+
+def main(argv=None):
+    parser = _argparse.ArgumentParser(
+        prog="nrn-diff",
+        description="Diff two NEURON models, given as Python or HOC scripts or as "
+        "saved snapshots, and print each difference as a line of JSON. Exits with 0 if "
+        "the models are identical, 1 if they differ and 2 on errors.",
+    )
+    parser.add_argument("left", help="Model script or snapshot")
+    parser.add_argument("right", help="Model script or snapshot")
+    parser.add_argument(
+        "--summary",
+        action="store_true",
+        help="Only print the number of differences of each type",
+    )
+    parser.add_argument(
+        "--type",
+        dest="types",
+        action="append",
+        metavar="TYPE",
+        help="Only report differences of this type, such as ParameterDifference. "
+        "Can be given multiple times.",
+    )
+    parser.add_argument(
+        "--max-diffs", type=int, help="Stop after this many differences"
+    )
+    args = parser.parse_args(argv)
+    try:
+        types = _get_types(args.types)
+        with _tempfile.TemporaryDirectory() as tmp:
+            left, right = _load_models([args.left, args.right], _pathlib.Path(tmp))
+            counts = _diff(left, right, types, args.max_diffs, args.summary)
+    except Exception as e:
+        print(f"nrn-diff: error: {e}", file=_sys.stderr)
+        return 2
+    if args.summary:
+        _write({"total": sum(counts.values()), "types": dict(counts)})
+    return 1 if counts else 0
+
+
+def _get_types(names):
+    from . import _differences
+
+    if not names:
+        return None
+    types = {
+        cls.__name__: cls
+        for cls in vars(_differences).values()
+        if isinstance(cls, type) and issubclass(cls, _differences.Difference)
+    }
+    try:
+        return tuple(types[name] for name in names)
+    except KeyError as e:
+        raise ValueError(
+            f"Unknown difference type {e}, choose from {', '.join(sorted(types))}"
+        ) from None
+
+
+def _load_models(paths, tmp):
+    from ._snapshot import Snapshot
+
+    scripts = [
+        (i, path)
+        for i, path in enumerate(paths)
+        if _pathlib.Path(path).suffix in (".py", ".hoc")
+    ]
+    models = [*paths]
+    if scripts:
+        context = _multiprocessing.get_context("spawn")
+        with _futures.ProcessPoolExecutor(len(scripts), mp_context=context) as executor:
+            futures = {
+                i: executor.submit(capture_script, path, str(tmp / str(i)))
+                for i, path in scripts
+            }
+            for i, future in futures.items():
+                models[i] = future.result()
+    return [
+        Snapshot.load(model, mmap=_pathlib.Path(model).is_dir()) for model in models
+    ]
+
+
+def capture_script(path, out):
+    """
+    Run a Python or HOC model script, and save the sections it creates as a snapshot.
+    """
+    # Run the script from its own directory, so that it finds the files it loads. NEURON
+    # is imported afterwards, as it loads the mechanisms of the working directory.
+    path = _os.path.abspath(path)
+    _os.chdir(_os.path.dirname(path))
+    from neuron import h
+    from ._snapshot import Snapshot
+
+    before = set(h.allsec())
+    if path.endswith(".hoc"):
+        if not h.load_file(path):
+            raise RuntimeError(f"Could not load '{path}'")
+        namespace = None
+    else:
+        # Keep the namespace of the script, Python sections are deleted when garbage
+        # collected.
+        namespace = _runpy.run_path(path, run_name="__main__")
+    sections = [sec for sec in h.allsec() if sec not in before]
+    Snapshot.capture(sections).save(out)
+    del namespace
+    return out
+
+
+def _diff(left, right, types, max_diffs, summary):
+    from . import iter_diff, Model
+    from ._records import _plain
+
+    counts = _collections.Counter()
+    for diff in iter_diff(Model(left), Model(right), max_diffs=max_diffs, types=types):
+        counts[diff.name] += 1
+        if not summary:
+            _write(
+                {
+                    "type": diff.name,
+                    "labels": diff.get_labels(),
+                    "values": _plain(diff.get_values()),
+                }
+            )
+    return counts
+
+
+def _write(obj):
+    print(_json.dumps(obj, default=_json_default), flush=True)
+
+
+def _json_default(obj):
+    if isinstance(obj, (_np.ndarray, _np.generic)):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if __name__ == "__main__":
+    _sys.exit(main())
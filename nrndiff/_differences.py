@@ -1,11 +1,43 @@
 import abc as _abc
+import functools as _functools
 import numpy as _np
 from neuron import h as _h
+from . import _models, _snapshot
+
+
+def _cache_result(f):
+    # Values are fetched through the NEURON bridge, so only compute them once per
+    # difference. The cache is keyed by the original function so that `super()` calls
+    # are cached separately.
+    @_functools.wraps(f)
+    def cached(self):
+        try:
+            return self._cache[f]
+        except KeyError:
+            result = self._cache[f] = f(self)
+            return result
+
+    return cached
 
 
 class Difference(_abc.ABC):
     def __init__(self, differ):
         self._differ = differ
+        self._cache = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in ("get_values", "is_different"):
+            if name in cls.__dict__:
+                setattr(cls, name, _cache_result(cls.__dict__[name]))
+
+    def _seed(self, values=None, different=True):
+        """
+        Store values that are already known, so they're not fetched from NEURON again.
+        """
+        if values is not None:
+            self._cache[type(self).get_values.__wrapped__] = values
+        self._cache[type(self).is_different.__wrapped__] = different
 
     @property
     def name(self):
@@ -33,6 +65,7 @@ class Difference(_abc.ABC):
     def get_values(self):
         pass
 
+    @_cache_result
     def is_different(self):
         a, b = self.get_values()
         return a != b
@@ -61,6 +94,7 @@ class TypeIdentityDifference(TypeDifference):
 
 class AttributeDifference(Difference):
     def __init_subclass__(cls, attr=None, **kwargs):
+        super().__init_subclass__(**kwargs)
         if attr is None:
             raise TypeError("`attr` class argument missing.")
         cls._attr = attr
@@ -120,26 +154,208 @@ class SegmentPotentialDifference(AttributeDifference, attr="v"):
 
 
 class SectionPointDifference(Difference):
+    # Tolerances of the point comparison, see `numpy.isclose`.
+    rtol = 1e-05
+    atol = 1e-08
+
     def get_values(self):
-        l, r = self.differ.left, self.differ.right
-        return (
-            _np.array(
-                [(l.x3d(i), l.y3d(i), l.z3d(i), l.diam3d(i)) for i in range(l.n3d())]
-            ),
-            _np.array(
-                [(r.x3d(i), r.y3d(i), r.z3d(i), r.diam3d(i)) for i in range(r.n3d())]
-            ),
+        return _snapshot.get_points(self.differ.left), _snapshot.get_points(
+            self.differ.right
+        )
+
+    def is_different(self):
+        l, r = self.get_values()
+        return l.shape != r.shape or len(self.get_differing_points()) > 0
+
+    @_cache_result
+    def get_differing_points(self):
+        """
+        Get the indices of the points that differ, including the points that only exist
+        on one side.
+        """
+        l, r = self.get_values()
+        n = min(len(l), len(r))
+        close = _np.isclose(l[:n], r[:n], rtol=self.rtol, atol=self.atol).all(axis=1)
+        return _np.concatenate(
+            (_np.flatnonzero(~close), _np.arange(n, max(len(l), len(r))))
         )
 
+
+class VectorDifference(Difference):
+    # Tolerances of the comparison, see `numpy.isclose`.
+    rtol = 1e-05
+    atol = 1e-08
+
+    def get_values(self):
+        # Views of the vectors' data, without copying them. They're only valid for as
+        # long as the vectors aren't resized.
+        return self.differ.left.as_numpy(), self.differ.right.as_numpy()
+
     def is_different(self):
+        return self.get_first_divergence() is not None
+
+    @_cache_result
+    def get_first_divergence(self):
+        """
+        Get the first index at which the vectors differ, or at which one of them ends,
+        or ``None`` if they're equal.
+        """
         l, r = self.get_values()
-        return l.shape != r.shape or not _np.allclose(l, r)
+        n = min(len(l), len(r))
+        # Compare in blocks, so that long equal prefixes don't need a full size mask.
+        for start in range(0, n, _BLOCK_SIZE):
+            stop = min(start + _BLOCK_SIZE, n)
+            close = _np.isclose(
+                l[start:stop],
+                r[start:stop],
+                rtol=self.rtol,
+                atol=self.atol,
+                equal_nan=True,
+            )
+            if not close.all():
+                return start + int(_np.argmin(close))
+        return n if len(l) != len(r) else None
+
+    @_cache_result
+    def get_max_error(self):
+        """
+        Get the maximum absolute error over the length the vectors have in common.
+        """
+        l, r = self.get_values()
+        n = min(len(l), len(r))
+        if not n:
+            return 0.0
+        return float(_np.nanmax(_np.abs(l[:n] - r[:n]), initial=0.0))
+
+
+_BLOCK_SIZE = 1 << 16
+
+
+class ListLengthDifference(Difference):
+    def continue_diff(self):
+        # The items the lists have in common are still compared.
+        return True
+
+    def get_values(self):
+        return len(self.differ.left), len(self.differ.right)
+
+
+class SegmentPointProcessDifference(Difference):
+    def continue_diff(self):
+        # The point processes of the same type are still compared.
+        return True
+
+    @_cache_result
+    def get_point_processes(self):
+        return (
+            _get_point_processes(self.differ.left),
+            _get_point_processes(self.differ.right),
+        )
+
+    def get_values(self):
+        return tuple(
+            sorted(map(_models.template_name, point_processes))
+            for point_processes in self.get_point_processes()
+        )
+
+
+def _get_point_processes(seg):
+    try:
+        return seg.point_processes()
+    except AttributeError:
+        # Snapshots don't capture point processes.
+        return []
+
+
+class PointProcessParameterDifference(Difference):
+    def continue_diff(self):
+        return True
+
+    def get_values(self):
+        return (
+            _get_point_process_parameters(self.differ.left),
+            _get_point_process_parameters(self.differ.right),
+        )
+
+
+def _get_point_process_parameters(point_process):
+    return {
+        name: getattr(point_process, name)
+        for name in _get_parameter_names(_models.template_name(point_process))
+    }
+
+
+@_functools.lru_cache(maxsize=None)
+def _get_parameter_names(mech):
+    standard = _h.MechanismStandard(mech, 1)
+    name = _h.ref("")
+    names = []
+    for i in range(int(standard.count())):
+        standard.name(name, i)
+        names.append(name[0])
+    return tuple(names)
+
+
+class ConnectionDifference(Difference):
+    @_cache_result
+    def get_match(self):
+        return self.differ.left.match(self.differ.right)
+
+    def continue_diff(self):
+        return True
+
+    def get_values(self):
+        # The NetCons that exist on only one side.
+        _, left_netcons, right_netcons = self.get_match()
+        return left_netcons, right_netcons
+
+    def is_different(self):
+        left_netcons, right_netcons = self.get_values()
+        return bool(left_netcons or right_netcons)
+
+
+class NetConWeightDifference(Difference):
+    def continue_diff(self):
+        return True
+
+    def get_values(self):
+        return get_weights(self.differ.left), get_weights(self.differ.right)
+
+
+def get_weights(netcon):
+    weight = netcon.weight
+    return [weight[i] for i in range(int(netcon.wcnt()))]
+
+
+class NetConDelayDifference(AttributeDifference, attr="delay"):
+    pass
+
+
+class NetConThresholdDifference(Difference):
+    def continue_diff(self):
+        return True
+
+    def get_values(self):
+        return get_threshold(self.differ.left), get_threshold(self.differ.right)
+
+
+def get_threshold(netcon):
+    """
+    Get the threshold of a NetCon, or ``None`` if its source is an artificial cell or
+    missing.
+    """
+    # Reading the threshold of these NetCons aborts NEURON.
+    if not netcon.valid():
+        return None
+    pre = netcon.pre()
+    if pre is not None and getattr(pre, "get_segment", None) is None:
+        return None
+    return netcon.threshold
 
 
 class SectionChildrenDifference(Difference):
     def get_values(self):
-        # todo: Maybe try to puzzle together a way to stable sort sections to improve
-        #  diff robustness vs insert order.
+        # `SectionDiffer` matches the children up independent of their order.
         return self.differ.left.children(), self.differ.right.children()
 
     def is_different(self):
@@ -148,38 +364,110 @@ class SectionChildrenDifference(Difference):
 
 
 class SegmentMechanismDifference(Difference):
+    @_cache_result
+    def _get_named_values(self):
+        # Sort by name, the iteration order of mechanisms depends on insertion order.
+        return (
+            sorted(((mech.name(), mech) for mech in self.differ.left), key=_first),
+            sorted(((mech.name(), mech) for mech in self.differ.right), key=_first),
+        )
+
     def get_values(self):
-        return [*self.differ.left], [*self.differ.right]
+        left, right = self._get_named_values()
+        return [mech for _, mech in left], [mech for _, mech in right]
 
     def is_different(self):
-        left, right = self.get_values()
-        left_set = sorted(mech.name() for mech in left)
-        right_set = sorted(mech.name() for mech in right)
-        return left_set != right_set
+        left, right = self._get_named_values()
+        return [name for name, _ in left] != [name for name, _ in right]
+
+
+def _first(item):
+    return item[0]
 
 
 class SourceDifference(Difference):
     def get_values(self):
-        left_source = getattr(_h, self.differ.left.name()).file
-        right_source = getattr(_h, self.differ.right.name()).file
-        return left_source, right_source
+        return _get_source(self.differ.left), _get_source(self.differ.right)
+
+
+def _get_source(mech):
+    try:
+        # Snapshot mechanisms carry the source file they were captured with.
+        return mech.file
+    except AttributeError:
+        return getattr(_h, mech.name()).file
 
 
 class ParameterDifference(Difference):
     def get_labels(self):
         return (
-            f"{self.left.mech().segment().name()}.{self.left.name()}",
-            f"{self.right.mech().segment().name()}.{self.right.name()}",
+            f"{self.left.mech().segment()}.{self.left.name()}",
+            f"{self.right.mech().segment()}.{self.right.name()}",
+        )
+
+    def continue_diff(self):
+        return True
+
+    def get_values(self):
+        # Array-valued range variables give arrays of values.
+        return (
+            _snapshot.get_value(self.differ.left),
+            _snapshot.get_value(self.differ.right),
         )
 
+    def is_different(self):
+        l, r = self.get_values()
+        if _np.ndim(l) or _np.ndim(r):
+            return _np.shape(l) != _np.shape(r) or bool(_values_differ(l, r).any())
+        return bool(_values_differ(l, r))
+
+
+def _values_differ(l, r):
+    # Values that are missing on both sides, as NaN in snapshots, aren't different.
+    l, r = _np.asarray(l, dtype=float), _np.asarray(r, dtype=float)
+    return (l != r) & ~(_np.isnan(l) & _np.isnan(r))
+
+
+class ModelRootDifference(Difference):
+    @_cache_result
+    def get_match(self):
+        left, right = self.differ.left, self.differ.right
+        return _as_model(left).match(_as_model(right))
+
+    def continue_diff(self):
+        return True
+
+    def get_values(self):
+        # The roots that couldn't be matched on either side.
+        _, left_roots, right_roots = self.get_match()
+        return left_roots, right_roots
+
+    def is_different(self):
+        left_roots, right_roots = self.get_values()
+        return bool(left_roots or right_roots)
+
+
+def _as_model(obj):
+    return obj if isinstance(obj, _models.Model) else _models.Model(obj)
+
+
+class SnapshotRootDifference(ModelRootDifference):
+    pass
+
+
+class GidDifference(Difference):
+    @_cache_result
+    def get_match(self):
+        return self.differ.left.match(self.differ.right)
+
     def continue_diff(self):
         return True
 
     def get_values(self):
-        # Compare parameter value, even though it might be missing on the right side:
-        # differences in mechanism will be detected at some point anyway covering the
-        # false positives in this logic.
-        pname = self.differ.left.name()[: -len(self.differ.left.mech().name()) - 1]
-        l = getattr(self._differ.left.mech(), pname, None)
-        r = getattr(self._differ.right.mech(), pname, None)
-        return l, r
+        # The gids that exist on only one side.
+        _, left_gids, right_gids = self.get_match()
+        return left_gids, right_gids
+
+    def is_different(self):
+        left_gids, right_gids = self.get_values()
+        return bool(left_gids or right_gids)
@@ -1,6 +1,11 @@
 import abc as _abc
-from . import _differences
-from neuron import nrn as _nrn
+import functools as _functools
+import numpy as _np
+from . import _differences, _models, _patches, _snapshot, _util
+from neuron import h as _h, hoc as _hoc, nrn as _nrn
+
+# The differs hash mechanisms and register the range variable type, so patch them first.
+_patches.apply()
 
 
 def get_differ_for(nrnobj):
@@ -15,6 +20,7 @@ class Differ(_abc.ABC):
         self._left = left
         self._right = right
         self._parent = parent
+        self._possible_differences = None
 
     @property
     def left(self):
@@ -33,10 +39,27 @@ class Differ(_abc.ABC):
             raise TypeError(
                 "Differ child classes must provide `difftype` class argument"
             )
-        Differ._differs[difftype] = cls
+        for t in difftype if isinstance(difftype, tuple) else (difftype,):
+            Differ._differs[t] = cls
+
+    @property
+    def possible_differences(self):
+        if self._possible_differences is None:
+            self._possible_differences = self.get_possible_differences()
+        return self._possible_differences
+
+    def get_difference(self, difftype):
+        """
+        Get this differ's difference of the given type, reusing the instance that was
+        checked by `get_diff` so that its values aren't fetched again.
+        """
+        for difference in self.possible_differences:
+            if type(difference) is difftype:
+                return difference
+        return difftype(self)
 
     def get_diff(self):
-        return [d for d in self.get_possible_differences() if d.is_different()]
+        return [d for d in self.possible_differences if d.is_different()]
 
     @_abc.abstractmethod
     def get_possible_differences(self):
@@ -45,6 +68,13 @@ class Differ(_abc.ABC):
     def get_children(self):
         return []
 
+    def get_differ_pairs(self):
+        """
+        Get the pairs of objects that this differ creates differs for: its children, and
+        any objects that it diffs itself instead of walking them.
+        """
+        return self.get_children()
+
 
 class TypeDiffer(Differ, difftype=type):
     def get_possible_differences(self):
@@ -55,7 +85,7 @@ class TypeDiffer(Differ, difftype=type):
         return [type_diff] if type_diff.is_different() else [typeid_diff]
 
 
-class SectionDiffer(Differ, difftype=_nrn.Section):
+class SectionDiffer(Differ, difftype=(_nrn.Section, _snapshot.SnapshotSection)):
     def get_possible_differences(self):
         return [
             _differences.SectionLengthDifference(self),
@@ -69,17 +99,20 @@ class SectionDiffer(Differ, difftype=_nrn.Section):
         ]
 
     def get_children(self):
-        # Use the difference class because it sorts the values
-        child_sections = _differences.SectionChildrenDifference(self).get_values()
+        # Use the difference because it has already fetched the children
+        child_sections = self.get_difference(
+            _differences.SectionChildrenDifference
+        ).get_values()
+        matched, _, _ = _models.match_sections(*child_sections)
         return [
             # Child segments
             *zip(self.left, self.right),
-            # Child sections
-            *zip(*child_sections),
+            # Child sections, matched independent of their order
+            *matched,
         ]
 
 
-class SegmentDiffer(Differ, difftype=_nrn.Segment):
+class SegmentDiffer(Differ, difftype=(_nrn.Segment, _snapshot.SnapshotSegment)):
     def get_possible_differences(self):
         return [
             _differences.SegmentXDifference(self),
@@ -88,39 +121,107 @@ class SegmentDiffer(Differ, difftype=_nrn.Segment):
             _differences.SegmentInputResistanceDifference(self),
             _differences.SegmentPotentialDifference(self),
             _differences.SegmentMechanismDifference(self),
+            _differences.SegmentPointProcessDifference(self),
         ]
 
     def get_children(self):
-        # Use the difference class because it sorts the values
-        child_mechs = _differences.SegmentMechanismDifference(self).get_values()
+        # Use the differences, which have already fetched the mechanisms and point
+        # processes, and sort the mechanisms
+        child_mechs = self.get_difference(
+            _differences.SegmentMechanismDifference
+        ).get_values()
         return [
             # Child mechanisms
             *zip(*child_mechs),
+            # Point processes, paired by type in order
+            *_match_point_processes(
+                *self.get_difference(
+                    _differences.SegmentPointProcessDifference
+                ).get_point_processes()
+            ),
             # Parent section
             (self.left.sec, self.right.sec),
         ]
 
 
-class MechanismDiffer(Differ, difftype=_nrn.Mechanism):
+def _match_point_processes(left, right):
+    if not left or not right:
+        return []
+    return _util.match_pairs(
+        left,
+        right,
+        [(_models.template_name, _models.template_name)],
+    )[0]
+
+
+class MechanismDiffer(Differ, difftype=(_nrn.Mechanism, _snapshot.SnapshotMechanism)):
+    def __init__(self, left, right, parent):
+        super().__init__(left, right, parent)
+        self._parameters = None
+
     def get_possible_differences(self):
-        return [_differences.SourceDifference(self)]
+        source = _differences.SourceDifference(self)
+        if source.is_different():
+            return [source]
+        return [source, *self._get_parameter_differences()]
+
+    def get_parameters(self):
+        """
+        Get the pairs of range variables of the mechanisms, paired in order, with the
+        flat lists of their values and the number of values of each pair.
+        """
+        if self._parameters is None:
+            lvars, lvalues, lcounts = _snapshot.get_parameters(self.left)
+            rvars, rvalues, rcounts = _snapshot.get_parameters(self.right)
+            self._parameters = (
+                [*zip(lvars, rvars)],
+                (lvalues, rvalues),
+                (lcounts, rcounts),
+            )
+        return self._parameters
+
+    def _get_parameter_differences(self):
+        # Instead of walking each range variable, compare all values of the mechanism at
+        # once, and only create differs for the parameters that differ.
+        pairs, (lvalues, rvalues), (lcounts, rcounts) = self.get_parameters()
+        if lvalues == rvalues:
+            return []
+        if lcounts[: len(pairs)] == rcounts[: len(pairs)]:
+            n = sum(lcounts[: len(pairs)])
+            differ = _differences._values_differ(lvalues[:n], rvalues[:n])
+            if not differ.any():
+                return []
+            var_ids = _np.repeat(_np.arange(len(pairs)), lcounts[: len(pairs)])
+            different = _np.unique(var_ids[differ]).tolist()
+        else:
+            # The layouts differ, so let the differences compare the values themselves.
+            different = range(len(pairs))
+        differences = []
+        for i in different:
+            if isinstance(self.parent, ParameterDiffer) and pairs[i] == (
+                self.parent.left,
+                self.parent.right,
+            ):
+                # The walk started at this parameter, and has already diffed it.
+                continue
+            difference = _differences.ParameterDifference(
+                ParameterDiffer(*pairs[i], self)
+            )
+            if difference.is_different():
+                differences.append(difference)
+        return differences
 
     def get_children(self):
-        c = [
-            # Parent segment
-            (self.left.segment(), self.right.segment()),
-            # Child parameters
-            *zip(self.left, self.right),
-        ]
         return [
             # Parent segment
             (self.left.segment(), self.right.segment()),
-            # Child parameters
-            *zip(self.left, self.right),
         ]
 
+    def get_differ_pairs(self):
+        return [*self.get_children(), *self.get_parameters()[0]]
 
-class ParameterDiffer(Differ, difftype=_nrn.RangeVar):
+
+class ParameterDiffer(Differ, difftype=(_nrn.RangeVar, _snapshot.SnapshotRangeVar)):
     def get_possible_differences(self):
         return [_differences.ParameterDifference(self)]
 
@@ -129,3 +230,134 @@ class ParameterDiffer(Differ, difftype=_nrn.RangeVar):
             # Parent mech
             (self.left.mech(), self.right.mech())
         ]
+
+
+class ModelDiffer(Differ, difftype=_models.Model):
+    def get_possible_differences(self):
+        return [_differences.ModelRootDifference(self)]
+
+    def get_children(self):
+        # Matched pairs of root sections
+        return self.get_difference(_differences.ModelRootDifference).get_match()[0]
+
+
+class SnapshotDiffer(Differ, difftype=_snapshot.Snapshot):
+    def get_possible_differences(self):
+        return [_differences.SnapshotRootDifference(self)]
+
+    def get_children(self):
+        # Matched pairs of root sections
+        return self.get_difference(_differences.SnapshotRootDifference).get_match()[0]
+
+
+class CellMapDiffer(Differ, difftype=_models.CellMap):
+    def get_possible_differences(self):
+        return [_differences.GidDifference(self)]
+
+    def get_children(self):
+        # Pairs of cells with the same gid
+        return self.get_difference(_differences.GidDifference).get_match()[0]
+
+
+class VectorDiffer(Differ, difftype=_h.Vector):
+    def get_possible_differences(self):
+        return [_differences.VectorDifference(self)]
+
+
+class ListDiffer(Differ, difftype=_h.List):
+    def get_possible_differences(self):
+        return [_differences.ListLengthDifference(self)]
+
+    def get_children(self):
+        # Pairs of items at the same position
+        return [*zip(self.left, self.right)]
+
+
+# Point processes don't have a Python type of their own, so this differ is registered
+# for all HOC objects, and only diffs point processes.
+class PointProcessDiffer(Differ, difftype=_hoc.HocObject):
+    def get_possible_differences(self):
+        if not (_is_point_process(self.left) and _is_point_process(self.right)):
+            return []
+        return [_differences.PointProcessParameterDifference(self)]
+
+    def get_children(self):
+        segs = [getattr(pp, "get_segment", None) for pp in (self.left, self.right)]
+        if None in segs:
+            # Artificial cells have no segment.
+            return []
+        return [
+            # Segment of the point process
+            (segs[0](), segs[1]())
+        ]
+
+
+def _is_point_process(obj):
+    return _models.template_name(obj) in _get_point_process_types()
+
+
+@_functools.lru_cache(maxsize=None)
+def _get_point_process_types():
+    types = _h.MechanismType(1)
+    name = _h.ref("")
+    names = set()
+    for i in range(int(types.count())):
+        types.select(i)
+        types.selected(name)
+        names.add(name[0])
+    return frozenset(names)
+
+
+class NetConDiffer(Differ, difftype=_h.NetCon):
+    def get_possible_differences(self):
+        return [
+            _differences.NetConWeightDifference(self),
+            _differences.NetConDelayDifference(self),
+            _differences.NetConThresholdDifference(self),
+        ]
+
+
+class ConnectivityDiffer(Differ, difftype=_models.Connectivity):
+    def get_possible_differences(self):
+        connections = _differences.ConnectionDifference(self)
+        return [connections, *self._get_netcon_differences(connections.get_match()[0])]
+
+    def _get_netcon_differences(self, pairs):
+        # Instead of walking each pair of NetCons, compare the delays, thresholds and
+        # weights of all pairs at once, and only create differs for the pairs that
+        # differ.
+        if not pairs:
+            return []
+        left, right = zip(*pairs)
+        ldelay, lthreshold, lcounts, lweights = _get_netcon_arrays(left)
+        rdelay, rthreshold, rcounts, rweights = _get_netcon_arrays(right)
+        different = (ldelay != rdelay) | _differences._values_differ(
+            lthreshold, rthreshold
+        )
+        if lcounts == rcounts:
+            pair_ids = _np.repeat(_np.arange(len(pairs)), lcounts)
+            different[pair_ids[lweights != rweights]] = True
+        else:
+            # The layouts differ, so let the differs compare the weights themselves.
+            different[:] = True
+        differences = []
+        for i in _np.flatnonzero(different).tolist():
+            differences.extend(NetConDiffer(*pairs[i], self).get_diff())
+        return differences
+
+    def get_differ_pairs(self):
+        # Pairs of NetCons with the same key
+        return self.get_difference(_differences.ConnectionDifference).get_match()[0]
+
+
+def _get_netcon_arrays(netcons):
+    weights = [_differences.get_weights(netcon) for netcon in netcons]
+    counts = [len(w) for w in weights]
+    return (
+        _np.array([netcon.delay for netcon in netcons]),
+        _np.array(
+            [_differences.get_threshold(netcon) for netcon in netcons], dtype=float
+        ),
+        counts,
+        _np.fromiter((x for w in weights for x in w), dtype=float, count=sum(counts)),
+    )
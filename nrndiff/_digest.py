@@ -0,0 +1,135 @@
+"""
+Merkle-style content digests of section subtrees.
+
+The digest of a section covers its own attributes, 3D points, segments, mechanisms,
+range variables and point processes, and the local names and digests of its children,
+so two sections with equal digests have identical subtrees and the walk can skip them.
+"""
+
+import hashlib as _hashlib
+import numpy as _np
+from neuron import nrn as _nrn
+from ._differences import (
+    _get_point_process_parameters,
+    _get_point_processes,
+    _get_source,
+)
+from ._models import local_name, template_name
+from ._snapshot import SnapshotSection, get_parameters, get_points
+
+_SECTION_TYPES = (_nrn.Section, SnapshotSection)
+
+
+class DigestCache:
+    """
+    Cache of section subtree digests of one model. Keep a cache around to reuse the
+    digests of a reference model across diffs, and :meth:`clear` it when the model
+    changes. The cache holds references to the sections it has digested.
+    """
+
+    def __init__(self):
+        self._digests = {}
+
+    def __len__(self):
+        return len(self._digests)
+
+    def clear(self):
+        self._digests.clear()
+
+    def discard(self, section):
+        """
+        Discard the digests of a section that has changed, and of its ancestors, whose
+        digests cover it.
+        """
+        # Parents are digested after their children, so if a section has no digest,
+        # neither have its ancestors.
+        while section is not None and self._digests.pop(section, None) is not None:
+            section = _get_parent(section)
+
+    def digest(self, section):
+        """
+        Get the digest of the subtree of `section`.
+        """
+        try:
+            return self._digests[section]
+        except KeyError:
+            pass
+        # Post-order walk, so that the children are digested before their parent.
+        stack = [(section, None)]
+        while stack:
+            sec, children = stack.pop()
+            if sec in self._digests:
+                continue
+            if children is None:
+                children = sec.children()
+                stack.append((sec, children))
+                stack.extend(
+                    (child, None) for child in children if child not in self._digests
+                )
+            else:
+                hasher = _hashlib.blake2b(digest_size=16)
+                _update_section(hasher, sec)
+                # Children are paired by local name in the walk, so fold them in by
+                # local name, and ties in order, as `match_sections` pairs them.
+                names = [local_name(child) for child in children]
+                for i in sorted(range(len(children)), key=names.__getitem__):
+                    hasher.update(f"{names[i]}\0".encode())
+                    hasher.update(self._digests[children[i]])
+                self._digests[sec] = hasher.digest()
+        return self._digests[section]
+
+
+def _get_parent(section):
+    if isinstance(section, SnapshotSection):
+        return section.parent()
+    parent = section.parentseg()
+    return None if parent is None else parent.sec
+
+
+def get_digest_caches(digests):
+    """
+    Turn the `digests` argument of the diff functions into a pair of caches, or `None`.
+    It can be ``True`` for new caches, a single cache for both sides, or a pair of
+    caches in which ``None`` entries are replaced by new caches.
+    """
+    if digests is None or digests is False:
+        return None
+    if digests is True:
+        return DigestCache(), DigestCache()
+    if isinstance(digests, DigestCache):
+        return digests, digests
+    left, right = digests
+    return left or DigestCache(), right or DigestCache()
+
+
+def subtrees_match(caches, left, right):
+    """
+    Check whether `left` and `right` are sections with identical subtrees.
+    """
+    return (
+        isinstance(left, _SECTION_TYPES)
+        and isinstance(right, _SECTION_TYPES)
+        and caches[0].digest(left) == caches[1].digest(right)
+    )
+
+
+def _update_section(hasher, sec):
+    points = get_points(sec)
+    values = [sec.nseg, sec.L, sec.diam, sec.Ra, sec.cm, sec.v, len(points)]
+    hasher.update(_np.array(values, dtype=float).tobytes())
+    hasher.update(_np.ascontiguousarray(points).tobytes())
+    for seg in sec:
+        values = [seg.x, seg.area(), seg.volume(), seg.ri(), seg.v]
+        for mech in sorted(seg, key=lambda mech: mech.name()):
+            name = mech.name()
+            hasher.update(f"{name}:{_get_source(mech)}\0".encode())
+            rangevars, mech_values, _ = get_parameters(mech)
+            for rv in rangevars:
+                hasher.update(f"{rv.name()}:{len(rv)}\0".encode())
+            values.extend(mech_values)
+        # Sorted by type only, the walk pairs the point processes of a type in order.
+        for pp in sorted(_get_point_processes(seg), key=template_name):
+            parameters = _get_point_process_parameters(pp)
+            hasher.update(f"{template_name(pp)}:{','.join(parameters)}\0".encode())
+            values.extend(parameters.values())
+        hasher.update(_np.array(values, dtype=float).tobytes())
@@ -0,0 +1,45 @@
+"""
+Distributed diffs of parallel networks, in which each rank owns some of the cells.
+
+Each rank diffs the cells it owns, paired by gid, and the differences are gathered on
+rank 0 as `DiffRecord`s, since NEURON objects can't be sent between ranks.
+"""
+
+from neuron import h as _h
+from ._differences import GidDifference
+from ._models import CellMap
+from ._records import DiffRecord, children_cache
+
+
+def diff(left, right, pc=None):
+    from . import iter_diff
+
+    if pc is None:
+        pc = _h.ParallelContext()
+    left, right = (
+        cells if isinstance(cells, CellMap) else CellMap(cells)
+        for cells in (left, right)
+    )
+    children = children_cache()
+    records = [
+        (_get_gid(difference, left), DiffRecord.from_difference(difference, children))
+        for difference in iter_diff(left, right)
+    ]
+    count = int(pc.allreduce(len(records), 1))
+    gathered = pc.py_gather(records, 0)
+    if gathered is not None:
+        gathered = sorted(
+            (record for rank_records in gathered for record in rank_records),
+            key=lambda record: -1 if record[0] is None else record[0],
+        )
+    return count == 0, gathered
+
+
+def _get_gid(difference, cells):
+    if isinstance(difference, GidDifference):
+        return None
+    # Find the differ of the cell pair, right below the differ of the cell maps.
+    differ = difference.differ
+    while differ.parent is not None and differ.parent.left is not cells:
+        differ = differ.parent
+    return cells.gid(differ.left)
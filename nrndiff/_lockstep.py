@@ -0,0 +1,139 @@
+"""
+Lockstep simulation of two models, to find the first time at which their states diverge.
+
+Both models live in the same NEURON process, so they're advanced together by the same
+``h.fadvance`` calls, also when CVode is active. The state variables of both sides are
+gathered into vectors through pointers at each check, and compared in one operation.
+"""
+
+import functools as _functools
+import numpy as _np
+from neuron import h as _h, nrn as _nrn
+from ._models import Model, match_sections
+from ._snapshot import Snapshot
+
+# Margin for the comparison of simulation times, to absorb the rounding of `h.t`.
+_EPSILON = 1e-9
+# Initial membrane potential when the standard run system doesn't define `h.v_init`,
+# the same as its default.
+_V_INIT = -65.0
+
+
+class Divergence:
+    """
+    The states of two models that differ beyond the tolerance at the first check where
+    any of them did.
+
+    :ivar t: Simulation time of the check, in ms.
+    :ivar labels: Pairs of labels of the states that diverged, such as
+      ``("soma(0.5).v", "soma(0.5).v")``.
+    :ivar values: Arrays of the values of the diverged states, on each side.
+    """
+
+    def __init__(self, t, labels, values):
+        self.t = t
+        self.labels = labels
+        self.values = values
+
+    def __repr__(self):
+        return (
+            f"<Divergence of {len(self.labels)} states at t={self.t},"
+            f" max error {self.max_error}>"
+        )
+
+    @property
+    def max_error(self):
+        """
+        Maximum absolute error of the diverged states.
+        """
+        return float(_np.nanmax(_np.abs(self.values[0] - self.values[1]), initial=0.0))
+
+
+def diff(left, right, tstop, interval=None, v_init=None, rtol=1e-05, atol=1e-08):
+    # A section is diffed with its subtree, which the walk of the children covers.
+    models = [
+        Model([model] if isinstance(model, _nrn.Section) else model)
+        for model in (left, right)
+    ]
+    if any(isinstance(model.source, Snapshot) for model in models):
+        raise TypeError("Snapshots can't be simulated, diff live models.")
+    if v_init is None:
+        # `h.v_init` only exists once the standard run system is loaded.
+        v_init = _h.v_init if hasattr(_h, "v_init") else _V_INIT
+    _h.finitialize(v_init)
+    # Set up the pointers after initialization, which may reorganize the data.
+    labels, left_refs, right_refs = _pair_states(*models)
+    n = len(labels)
+    pointers = [_h.PtrVector(n), _h.PtrVector(n)]
+    for ptr, refs in zip(pointers, (left_refs, right_refs)):
+        for i, ref in enumerate(refs):
+            ptr.pset(i, ref)
+    vectors = [_h.Vector(n), _h.Vector(n)]
+    # Views of the vectors, that `gather` fills in without reallocating.
+    lvalues, rvalues = (vec.as_numpy() for vec in vectors)
+    next_check = _h.t
+    while True:
+        if _h.t >= next_check - _EPSILON:
+            for ptr, vec in zip(pointers, vectors):
+                ptr.gather(vec)
+            close = _np.isclose(lvalues, rvalues, rtol=rtol, atol=atol, equal_nan=True)
+            if not close.all():
+                diverged = _np.flatnonzero(~close)
+                return Divergence(
+                    _h.t,
+                    [labels[i] for i in diverged.tolist()],
+                    (lvalues[diverged], rvalues[diverged]),
+                )
+            if interval is not None:
+                next_check = _h.t + interval
+        if _h.t >= tstop - _EPSILON:
+            return None
+        _h.fadvance()
+
+
+def _pair_states(left, right):
+    # Walk the matched sections, and pair the states of their segments.
+    labels, left_refs, right_refs = [], [], []
+    stack = [*left.match(right)[0]]
+    while stack:
+        lsec, rsec = stack.pop()
+        if lsec.nseg == rsec.nseg:
+            for lseg, rseg in zip(lsec, rsec):
+                for name, size in _get_states(lseg, rseg):
+                    lref = getattr(lseg, "_ref_" + name)
+                    rref = getattr(rseg, "_ref_" + name)
+                    if size is None:
+                        labels.append((f"{lseg}.{name}", f"{rseg}.{name}"))
+                        left_refs.append(lref)
+                        right_refs.append(rref)
+                        continue
+                    # Array-valued states, such as `vext`, give a pointer per element.
+                    for k in range(size):
+                        labels.append((f"{lseg}.{name}[{k}]", f"{rseg}.{name}[{k}]"))
+                        left_refs.append(lref[k])
+                        right_refs.append(rref[k])
+        stack.extend(match_sections(lsec.children(), rsec.children())[0])
+    return labels, left_refs, right_refs
+
+
+def _get_states(lseg, rseg):
+    states = [("v", None)]
+    mechs = {mech.name() for mech in lseg} & {mech.name() for mech in rseg}
+    for mech in sorted(mechs):
+        states.extend(_get_mechanism_states(mech))
+    return states
+
+
+@_functools.lru_cache(maxsize=None)
+def _get_mechanism_states(mech):
+    """
+    Get the names of the STATE variables of a mechanism, with their size if they're
+    arrays, or ``None``.
+    """
+    standard = _h.MechanismStandard(mech, 3)
+    name = _h.ref("")
+    states = []
+    for i in range(int(standard.count())):
+        size = int(standard.name(name, i))
+        states.append((name[0], size if size > 1 else None))
+    return tuple(states)
@@ -0,0 +1,161 @@
+"""
+Diffs of one reference model against many variants, such as the models of a parameter
+sweep, reported as a matrix of variants by difference sites.
+
+The reference is indexed and digested once, and its digests let the walk of each variant
+skip the subtrees that are identical to the reference.
+"""
+
+import gc as _gc
+import numpy as _np
+from neuron import nrn as _nrn
+from ._digest import DigestCache
+from ._models import Model
+from ._records import DiffRecord, children_cache
+from ._snapshot import Snapshot
+
+
+class DiffMatrix:
+    """
+    Differences of many variants against one reference. A site is a type of difference
+    at a place in the model, such as the length of one section, found at the same path
+    of the walk in each variant.
+
+    :ivar sites: A :class:`DiffRecord` of each site, as first found.
+    :ivar mask: Boolean array of the sites that differ, with a row per variant and a
+      column per site.
+    :ivar records: The :class:`DiffRecord` of each difference, per variant.
+    :ivar positions: Integer array of the position of the record of each site in the
+      records of each variant, or -1 if the variant doesn't differ there, with the same
+      shape as `mask`.
+    """
+
+    def __init__(self, sites, mask, records, positions):
+        self.sites = sites
+        self.mask = mask
+        self.records = records
+        self.positions = positions
+        self._columns = {site: column for column, site in enumerate(sites)}
+
+    def __repr__(self):
+        return (
+            f"<DiffMatrix of {len(self.records)} variants by {len(self.sites)} sites>"
+        )
+
+    def __len__(self):
+        return len(self.records)
+
+    def counts(self):
+        """
+        Get the number of variants that differ at each site.
+        """
+        return self.mask.sum(axis=0)
+
+    def identical(self):
+        """
+        Get the indices of the variants that are identical to the reference.
+        """
+        return _np.flatnonzero(~self.mask.any(axis=1))
+
+    def values(self, site):
+        """
+        Get the recorded values of a site in each variant, or ``None`` for the variants
+        that don't differ there.
+
+        :param site: Index of the site, or its :class:`DiffRecord`.
+        """
+        # Records are equal when their type and path are.
+        column = site if isinstance(site, int) else self._columns[site]
+        return [
+            None if position < 0 else records[position].values
+            for records, position in zip(
+                self.records, self.positions[:, column].tolist()
+            )
+        ]
+
+
+def diff(reference, variants, digests=True):
+    references = _References(_as_model(reference), digests)
+    columns = {}
+    sites = []
+    records = []
+    for variant in variants:
+        variant = _as_model(variant)
+        left, right, digest_caches = references.get(variant)
+        children = children_cache()
+        variant_records = [
+            DiffRecord.from_difference(difference, children)
+            for difference in _iter_diff(left, right, digest_caches)
+        ]
+        for record in variant_records:
+            if record not in columns:
+                columns[record] = len(sites)
+                sites.append(record)
+        records.append(variant_records)
+    positions = _np.full((len(records), len(sites)), -1, dtype=_np.intp)
+    for row, variant_records in enumerate(records):
+        # A site that occurs more than once in a variant is looked up at its first.
+        row_columns, first = _np.unique(
+            _np.array([columns[record] for record in variant_records], dtype=_np.intp),
+            return_index=True,
+        )
+        positions[row, row_columns] = first
+    mask = positions >= 0
+    # Collect the garbage of all walks at once, instead of once per variant.
+    _gc.collect()
+    return DiffMatrix(sites, mask, records, positions)
+
+
+def _iter_diff(left, right, digests):
+    from . import iter_diff
+
+    return iter_diff(left, right, digests=digests)
+
+
+def _as_model(model):
+    # Index whole models once, single sections are walked as they are.
+    if isinstance(model, (_nrn.Section, Model)):
+        return model
+    return Model(model)
+
+
+class _References:
+    """
+    The reference, and its digests, live and as a snapshot. Snapshots can only be
+    compared to snapshots, so the reference is captured once if a variant is a snapshot,
+    and live variants are captured if the reference is a snapshot.
+    """
+
+    def __init__(self, reference, digests):
+        self._digests = digests
+        self._live = self._snapshot = None
+        if _is_snapshot(reference):
+            self._snapshot = (reference, self._new_cache())
+        else:
+            self._live = (reference, self._new_cache())
+
+    def _new_cache(self):
+        return DigestCache() if self._digests else None
+
+    def get(self, variant):
+        """
+        Get the reference and the variant to diff, and the digest caches to diff them
+        with.
+        """
+        if self._live is None and not _is_snapshot(variant):
+            variant = _capture(variant)
+        if _is_snapshot(variant):
+            if self._snapshot is None:
+                self._snapshot = (_capture(self._live[0]), self._new_cache())
+            reference, cache = self._snapshot
+        else:
+            reference, cache = self._live
+        return reference, variant, (cache, None) if self._digests else None
+
+
+def _is_snapshot(model):
+    return isinstance(model, Model) and isinstance(model.source, Snapshot)
+
+
+def _capture(model):
+    return Model(Snapshot.capture(model.source if isinstance(model, Model) else model))
@@ -0,0 +1,332 @@
+"""
+Topology index of complete models, used to match up the root sections of two models so
+that a whole model can be diffed in a single walk.
+"""
+
+import numpy as _np
+from neuron import h as _h, nrn as _nrn
+from ._snapshot import Snapshot, SnapshotSection, order_sections, _ordered_unique
+from ._util import match_pairs
+
+
+class Model:
+    """
+    Index of the root sections of a model, given as an iterable of sections or a
+    :class:`~nrndiff.Snapshot`. All sections in ``h.allsec()`` are used by default.
+    """
+
+    def __init__(self, sections=None):
+        if isinstance(sections, Model):
+            sections = sections.source
+        elif sections is None:
+            sections = [*_h.allsec()]
+        elif not isinstance(sections, Snapshot):
+            sections = [*sections]
+        self._source = sections
+        if isinstance(sections, Snapshot):
+            self._index_snapshot(sections)
+        else:
+            self._index_sections(sections)
+
+    def __repr__(self):
+        return f"<Model with {len(self.roots)} roots and {self.size} sections>"
+
+    @property
+    def source(self):
+        return self._source
+
+    def _index_sections(self, sections):
+        ordered = order_sections(sections)
+        index = {sec: i for i, sec in enumerate(ordered)}
+        root_of = []
+        roots = []
+        for i, sec in enumerate(ordered):
+            parent = sec.parentseg()
+            parent = index.get(parent.sec) if parent is not None else None
+            if parent is None:
+                roots.append(sec)
+                root_of.append(len(roots) - 1)
+            else:
+                root_of.append(root_of[parent])
+        nseg = [sec.nseg for sec in ordered]
+        n3d = [sec.n3d() for sec in ordered]
+        self._set_index(roots, [sec.name() for sec in roots], root_of, nseg, n3d)
+
+    def _index_snapshot(self, snapshot):
+        parents = snapshot["sec.parent"].tolist()
+        root_of = []
+        roots = []
+        for i, parent in enumerate(parents):
+            if parent < 0:
+                roots.append(i)
+                root_of.append(len(roots) - 1)
+            else:
+                root_of.append(root_of[parent])
+        n3d = _np.diff(snapshot["pt3d.offset"])
+        names = [str(snapshot["sec.name"][i]) for i in roots]
+        roots = [SnapshotSection(snapshot, i) for i in roots]
+        self._set_index(roots, names, root_of, snapshot["sec.nseg"], n3d)
+
+    def _set_index(self, roots, names, root_of, nseg, n3d):
+        nroots = len(roots)
+        self.roots = roots
+        self.size = len(root_of)
+        self._names = names
+        sizes = _np.bincount(root_of, minlength=nroots)
+        nsegs = _np.bincount(root_of, weights=nseg, minlength=nroots).astype(int)
+        n3ds = _np.bincount(root_of, weights=n3d, minlength=nroots).astype(int)
+        self._signatures = [*zip(sizes.tolist(), nsegs.tolist(), n3ds.tolist())]
+
+    def name(self, i):
+        return self._names[i]
+
+    def signature(self, i):
+        """
+        Structural signature of the i-th root: the number of sections, segments and 3D
+        points in its subtree.
+        """
+        return self._signatures[i]
+
+    def local_name(self, i):
+        return self._names[i].rsplit(".", 1)[-1]
+
+    def match(self, other):
+        """
+        Match the roots of this model to those of `other`, first by name, then by
+        structural signature and then by local name, and pair the remainder in order.
+
+        :returns: The matched pairs of roots, and the unmatched roots on each side.
+        """
+        pairs, left, right = match_keyed(
+            range(len(self.roots)),
+            range(len(other.roots)),
+            [
+                (self.name, other.name),
+                (self.signature, other.signature),
+                (self.local_name, other.local_name),
+            ],
+        )
+        return (
+            [(self.roots[l], other.roots[r]) for l, r in pairs],
+            [self.roots[l] for l in left],
+            [other.roots[r] for r in right],
+        )
+
+
+class CellMap:
+    """
+    Cells of a model by gid, such as the cells that a rank of a parallel network owns.
+    The cells can be root sections, snapshots, :class:`Model` indices or iterables of
+    sections, which are indexed as a :class:`Model`. Cells are matched by gid when two
+    cell maps are diffed.
+    """
+
+    def __init__(self, cells):
+        self._cells = {
+            int(gid): (
+                cell
+                if isinstance(cell, (_nrn.Section, Snapshot, Model))
+                else Model(cell)
+            )
+            for gid, cell in dict(cells).items()
+        }
+        self._gids = {cell: gid for gid, cell in self._cells.items()}
+
+    def __repr__(self):
+        return f"<CellMap of {len(self._cells)} cells>"
+
+    def __len__(self):
+        return len(self._cells)
+
+    def __getitem__(self, gid):
+        return self._cells[gid]
+
+    def gids(self):
+        return sorted(self._cells)
+
+    def gid(self, cell):
+        """
+        Get the gid of a cell of this map.
+        """
+        return self._gids[cell]
+
+    def match(self, other):
+        """
+        Match the cells of this map to those of `other` by gid.
+
+        :returns: The matched pairs of cells, in gid order, and the unmatched gids on
+          each side.
+        """
+        gids = set(self._cells)
+        other_gids = set(other._cells)
+        return (
+            [(self[gid], other[gid]) for gid in sorted(gids & other_gids)],
+            sorted(gids - other_gids),
+            sorted(other_gids - gids),
+        )
+
+
+class Connectivity:
+    """
+    Index of the NetCons of a model, keyed by their source, the segment of their target
+    and the type of their target point process, so that the connections of two models
+    can be joined in one pass. Sources are keyed by gid if they have one, otherwise by
+    their segment, or by their type for artificial cells. All NetCons are used by
+    default.
+
+    The cells that the NetCons connect are matched as in :class:`Model`.
+    """
+
+    def __init__(self, netcons=None):
+        self._netcons = [*(_h.List("NetCon") if netcons is None else netcons)]
+
+    def __repr__(self):
+        return f"<Connectivity of {len(self._netcons)} NetCons>"
+
+    def __len__(self):
+        return len(self._netcons)
+
+    @property
+    def netcons(self):
+        return self._netcons
+
+    def sections(self):
+        """
+        Get all sections of the cells that the NetCons connect.
+        """
+        connected = []
+        for netcon in self._netcons:
+            seg = netcon.preseg()
+            if seg is not None:
+                connected.append(seg.sec)
+            seg = _get_target_segment(netcon)
+            if seg is not None:
+                connected.append(seg.sec)
+        roots = _ordered_unique(
+            _h.SectionRef(sec=sec).root for sec in _ordered_unique(connected)
+        )
+        return [sec for root in roots for sec in root.wholetree()]
+
+    def match(self, other):
+        """
+        Match the NetCons of this index to those of `other` by key. NetCons with the
+        same key are paired in order.
+
+        :returns: The matched pairs of NetCons, and the unmatched NetCons on each side.
+        """
+        left_ids, right_ids = _number_sections(
+            Model(self.sections()), Model(other.sections())
+        )
+        left_keys = [_get_connection_key(netcon, left_ids) for netcon in self._netcons]
+        right_keys = [
+            _get_connection_key(netcon, right_ids) for netcon in other._netcons
+        ]
+        pairs, left, right = match_pairs(
+            range(len(left_keys)),
+            range(len(right_keys)),
+            [(left_keys.__getitem__, right_keys.__getitem__)],
+        )
+        return (
+            [(self._netcons[l], other._netcons[r]) for l, r in pairs],
+            [self._netcons[l] for l in left],
+            [other._netcons[r] for r in right],
+        )
+
+
+def _number_sections(left, right):
+    # Give each pair of matched sections the same number on both sides.
+    left_ids, right_ids = {}, {}
+    stack = [*left.match(right)[0]]
+    while stack:
+        lsec, rsec = stack.pop()
+        left_ids[lsec] = right_ids[rsec] = len(left_ids)
+        stack.extend(match_sections(lsec.children(), rsec.children())[0])
+    return left_ids, right_ids
+
+
+def _get_connection_key(netcon, section_ids):
+    gid = int(netcon.srcgid())
+    if gid >= 0:
+        source = gid
+    else:
+        seg = netcon.preseg()
+        if seg is not None:
+            source = _get_segment_key(seg, section_ids)
+        else:
+            pre = netcon.pre()
+            source = None if pre is None else template_name(pre)
+    target = netcon.syn()
+    if target is None:
+        return source, None, None
+    seg = _get_target_segment(netcon)
+    return (
+        source,
+        None if seg is None else _get_segment_key(seg, section_ids),
+        template_name(target),
+    )
+
+
+def _get_segment_key(seg, section_ids):
+    # Unmatched sections are keyed by name, so they only match themselves.
+    return section_ids.get(seg.sec, seg.sec.name()), seg.x
+
+
+def _get_target_segment(netcon):
+    target = netcon.syn()
+    # Artificial cells have no segment.
+    get_segment = getattr(target, "get_segment", None)
+    return None if get_segment is None else get_segment()
+
+
+def template_name(obj):
+    """
+    Name of the template of a HOC object, e.g. ``ExpSyn`` for ``ExpSyn[3]``.
+    """
+    return obj.hname().split("[", 1)[0]
+
+
+def local_name(sec):
+    """
+    Name of a section without the cell or template prefix, e.g. ``dend[2]`` for
+    ``Cell[0].dend[2]``.
+    """
+    return sec.name().rsplit(".", 1)[-1]
+
+
+def section_signature(sec):
+    """
+    Structural signature of a section: its number of segments, 3D points and children.
+    """
+    return sec.nseg, sec.n3d(), len(sec.children())
+
+
+def match_sections(left, right):
+    """
+    Match two lists of sections, such as the children of two sections, independent of
+    their order. Sections are matched by their local name, then by their structural
+    signature, and the remainder is paired in order.
+
+    :returns: The matched pairs, and the unmatched sections on each side.
+    """
+    left_names = [local_name(sec) for sec in left]
+    right_names = [local_name(sec) for sec in right]
+    if left_names == right_names:
+        return [*zip(left, right)], [], []
+    return match_keyed(
+        left,
+        right,
+        [
+            (dict(zip(left, left_names)).get, dict(zip(right, right_names)).get),
+            (section_signature, section_signature),
+        ],
+    )
+
+
+def match_keyed(left, right, keys):
+    """
+    Hash join `left` and `right` with `match_pairs`, and pair the remainder in order.
+    """
+    pairs, left, right = match_pairs(left, right, keys)
+    n = min(len(left), len(right))
+    pairs.extend(zip(left[:n], right[:n]))
+    return pairs, left[n:], right[n:]
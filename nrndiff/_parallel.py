@@ -0,0 +1,57 @@
+"""
+Multi-process diffs of complete models.
+
+NEURON objects can't be shared between processes, so both models are captured as
+snapshots, and the subtree of each matched pair of root sections is extracted into a
+small snapshot of its own. Workers diff these subtrees and return `DiffRecord`s, which
+are turned back into `Difference` objects between the roots of the original snapshots,
+as the subtrees have the same structure.
+"""
+
+import concurrent.futures as _futures
+import os as _os
+from . import _differs
+from ._models import Model
+from ._records import DiffRecord, children_cache
+from ._snapshot import Snapshot
+
+
+def diff(left, right, max_workers=None, chunksize=None):
+    left, right = (_as_snapshot(model) for model in (left, right))
+    differ = _differs.ModelDiffer(Model(left), Model(right), None)
+    diffs = differ.get_diff()
+    pairs = differ.get_children()
+    tasks = [
+        (left.subtree(lroot._index), right.subtree(rroot._index))
+        for lroot, rroot in pairs
+    ]
+    if not tasks:
+        return diffs
+    max_workers = min(max_workers or _os.cpu_count() or 1, len(tasks))
+    if chunksize is None:
+        # A few chunks per worker, to balance cells of different sizes.
+        chunksize = max(1, len(tasks) // (max_workers * 4))
+    with _futures.ProcessPoolExecutor(max_workers) as executor:
+        results = executor.map(_diff_subtrees, tasks, chunksize=chunksize)
+        for (lroot, rroot), records in zip(pairs, results):
+            diffs.extend(DiffRecord.to_differences(records, lroot, rroot, differ))
+    return diffs
+
+
+def _as_snapshot(model):
+    if isinstance(model, Model):
+        model = model.source
+    if isinstance(model, Snapshot):
+        return model
+    return Snapshot.capture([*model])
+
+
+def _diff_subtrees(task):
+    from . import iter_diff
+
+    left, right = task
+    children = children_cache()
+    return [
+        DiffRecord.from_difference(difference, children)
+        for difference in iter_diff(left.roots[0], right.roots[0])
+    ]
@@ -1,29 +1,68 @@
-"""This module patches a couple of __hash__ and __eq__ checks for stable comparisons"""
-import gc as _gc
+"""
+This module patches a couple of __hash__ and __eq__ checks for stable comparisons. The
+patches are applied by :func:`apply`, when the differs are first imported, so that
+importing `nrndiff` doesn't import NEURON or create any sections.
+"""
+
 from neuron import nrn as _nrn, h as _h
 
+_applied = False
+
+# Method lookups on `nrn.Mechanism` instances first search its range variables, so call
+# the method descriptors directly in the hot hashing path.
+_mech_segment = _nrn.Mechanism.segment
+_mech_name = _nrn.Mechanism.name
+
+
+def _nrnmech_key(self):
+    return hash(_mech_segment(self)), _mech_name(self)
+
+
+def _nrnrangevar_key(self):
+    # The range variable name includes the mechanism suffix, so it is unique per
+    # segment.
+    return hash(_mech_segment(_rangevar_mech(self))), _rangevar_name(self)
+
 
 def _nrnmech_hash(self):
-    return hash(f"seg:{hash(self.segment())}:mech:{self.name()}")
+    return hash(_nrnmech_key(self))
 
 
 def _nrnrangevar_hash(self):
-    return hash(f"seg:{hash(self.mech().segment())}:param:{self.name()}")
+    return hash(_nrnrangevar_key(self))
+
+
+def _nrnmech_eq(self, other):
+    return type(other) is type(self) and _nrnmech_key(self) == _nrnmech_key(other)
 
 
-def _hash_eq(self, other):
-    return hash(self) == hash(other)
+def _nrnrangevar_eq(self, other):
+    return type(other) is type(self) and _nrnrangevar_key(self) == _nrnrangevar_key(
+        other
+    )
 
 
-_s = _h.Section()
-_s.insert("pas")
-_RangeVar = type(next(iter(_s(0.5).pas)))
+def apply():
+    """
+    Patch the hashes and comparisons of mechanisms and range variables, and expose the
+    range variable type as ``nrn.RangeVar``. Applying the patches again does nothing.
+    """
+    global _applied, _RangeVar, _rangevar_mech, _rangevar_name
 
-_nrn.Mechanism.__hash__ = _nrnmech_hash
-_RangeVar.__hash__ = _nrnrangevar_hash
-_nrn.Mechanism.__eq__ = _hash_eq
-_RangeVar.__eq__ = _hash_eq
+    if _applied:
+        return
+    # The range variable type isn't exposed, so get it from a temporary section, which
+    # is deleted as soon as the last reference to it is dropped.
+    s = _h.Section()
+    s.insert("pas")
+    _RangeVar = type(next(iter(s(0.5).pas)))
+    del s
+    _rangevar_mech = _RangeVar.mech
+    _rangevar_name = _RangeVar.name
 
-del _s
-_nrn.RangeVar = _RangeVar
-_gc.collect()
+    _nrn.Mechanism.__hash__ = _nrnmech_hash
+    _RangeVar.__hash__ = _nrnrangevar_hash
+    _nrn.Mechanism.__eq__ = _nrnmech_eq
+    _RangeVar.__eq__ = _nrnrangevar_eq
+    _nrn.RangeVar = _RangeVar
+    _applied = True
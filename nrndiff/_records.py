@@ -0,0 +1,153 @@
+"""
+Compact records of differences, without references to the compared objects, that can be
+kept in bulk or sent between processes, and turned back into `Difference` objects.
+"""
+
+import weakref as _weakref
+import numpy as _np
+
+
+class DiffRecord:
+    """
+    Record of a difference, with its labels and values but without the compared objects.
+    Instead, the record holds the path of differs that led to the difference, as the
+    differ type and the index of the pair of objects in the differ pairs of the previous
+    differ at each step, so that the difference can be found again from the objects
+    that were diffed.
+
+    Values that aren't numbers, strings or arrays are recorded as strings. Only records
+    whose values are `exact`, with nothing recorded as a string, give back their values
+    when turned back into differences.
+    """
+
+    __slots__ = ("type", "path", "labels", "values", "exact")
+
+    def __init__(self, type, path, labels=None, values=None, exact=False):
+        self.type = type
+        self.path = path
+        self.labels = labels
+        self.values = values
+        self.exact = exact
+
+    def __repr__(self):
+        return f"<DiffRecord {self.name} {self.labels}>"
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, DiffRecord)
+            and self.type is other.type
+            and self.path == other.path
+        )
+
+    def __hash__(self):
+        return hash((self.type, self.path))
+
+    @property
+    def name(self):
+        return self.type.__name__
+
+    @classmethod
+    def from_difference(cls, difference, children=None):
+        """
+        Record a difference.
+
+        :param children: A cache of the children of the differs, to share when
+          recording many differences of the same walk. See :func:`children_cache`.
+        """
+        if children is None:
+            children = children_cache()
+        values = difference.get_values()
+        return cls(
+            type(difference),
+            _get_path(difference.differ, children),
+            difference.get_labels(),
+            _plain(values),
+            _is_plain(values),
+        )
+
+    def to_difference(self, left, right, parent=None):
+        """
+        Turn the record back into a `Difference` between objects of `left` and `right`,
+        the objects that were diffed. The values are fetched again when requested, unless
+        the record is `exact`.
+
+        :param parent: Differ to use as the parent of the first differ in the path.
+        """
+        return DiffRecord.to_differences([self], left, right, parent)[0]
+
+    @staticmethod
+    def to_differences(records, left, right, parent=None):
+        """
+        Turn records of the same diff back into `Difference` objects. Differs are shared
+        between records with the same path, as they are in a diff.
+        """
+        # Trie of the paths, with the differ and its children at each node.
+        root = {}
+        differences = []
+        for record in records:
+            node, level = None, root
+            for step in record.path:
+                child = level.get(step)
+                if child is None:
+                    differ_type, index = step
+                    if index is None:
+                        child = [differ_type(left, right, parent), None, {}]
+                    else:
+                        if node[1] is None:
+                            node[1] = node[0].get_differ_pairs()
+                        child = [differ_type(*node[1][index], node[0]), None, {}]
+                    level[step] = child
+                node, level = child, child[2]
+            difference = record.type(node[0])
+            if record.exact and hasattr(record.type.get_values, "__wrapped__"):
+                difference._seed(record.values)
+            else:
+                difference._seed(different=True)
+            differences.append(difference)
+        return differences
+
+
+def children_cache():
+    """
+    Create a cache of the index of each pair of children of a differ, for as long as
+    the differ exists.
+    """
+    return _weakref.WeakKeyDictionary()
+
+
+def _get_path(differ, children):
+    path = []
+    while differ.parent is not None:
+        parent = differ.parent
+        index = children.get(parent)
+        if index is None:
+            # Index the first occurrence of each pair.
+            index = children[parent] = {
+                pair: i for i, pair in reversed([*enumerate(parent.get_differ_pairs())])
+            }
+        path.append((type(differ), index[(differ.left, differ.right)]))
+        differ = parent
+    path.append((type(differ), None))
+    return tuple(reversed(path))
+
+
+def _is_plain(value):
+    if isinstance(value, (tuple, list)):
+        return all(_is_plain(v) for v in value)
+    return value is None or isinstance(
+        value, (bool, int, float, str, _np.generic, _np.ndarray)
+    )
+
+
+def _plain(value):
+    if isinstance(value, (tuple, list)):
+        return type(value)(_plain(v) for v in value)
+    if isinstance(value, _np.ndarray):
+        # Arrays can be views of NEURON's memory, such as the data of a Vector, so
+        # keep a copy that stays valid after the object changes.
+        return value.copy()
+    if value is None or isinstance(value, (bool, int, float, str, _np.generic)):
+        return value
+    if isinstance(value, type):
+        return value.__name__
+    return str(value)
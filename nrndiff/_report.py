@@ -0,0 +1,292 @@
+"""
+Reports of differences, with the location and values of each difference recorded once
+when the report is created, so that they can be filtered, grouped and summarized without
+fetching anything from NEURON again.
+"""
+
+import numpy as _np
+from neuron import hoc as _hoc, nrn as _nrn
+from . import _patches
+from ._digest import _get_parent
+from ._models import template_name
+from ._snapshot import (
+    SnapshotSection,
+    SnapshotSegment,
+    SnapshotMechanism,
+    SnapshotRangeVar,
+)
+
+# The range variable type is only known once the patches are applied.
+_patches.apply()
+
+# The keys that the differences are indexed by.
+FIELDS = ("type", "section", "cell", "mechanism", "parameter")
+
+_STATS = ("max", "min", "mean", "sum", "count")
+
+
+class DiffReport(list):
+    """
+    List of differences, as returned by :func:`~nrndiff.nrn_diff`, with an index of the
+    differences by type, and by the section, cell, mechanism and parameter that they
+    were found at. The cell of a section is the name of its root section. The values of
+    each difference are recorded when the report is created, and differences appended
+    afterwards aren't indexed.
+
+    :ivar x: Array of the segment location of each difference, or NaN.
+    :ivar values: The values of each difference, as returned by ``get_values()``.
+    """
+
+    def __init__(self, differences=()):
+        super().__init__(differences)
+        self._record()
+
+    def _record(self):
+        n = len(self)
+        keys = {field: {} for field in FIELDS}
+        codes = {field: _np.empty(n, dtype=_np.intp) for field in FIELDS}
+        self.x = _np.full(n, _np.nan)
+        self.values = []
+        scalars = _np.full((2, n), _np.nan)
+        cells = {}
+        for i, difference in enumerate(self):
+            values = _own(difference.get_values())
+            self.values.append(values)
+            if isinstance(values, tuple) and len(values) == 2:
+                scalars[:, i] = _scalar(values[0]), _scalar(values[1])
+            location = _locate(difference.left) or _locate(difference.right)
+            if location is None:
+                sec = cell = mechanism = parameter = None
+            else:
+                sec, self.x[i], mechanism, parameter = location
+                cell = _get_cell(sec, cells)
+                sec = sec.name()
+            row = (type(difference), sec, cell, mechanism, parameter)
+            for field, key in zip(FIELDS, row):
+                field_keys = keys[field]
+                code = field_keys.get(key)
+                if code is None:
+                    code = field_keys[key] = len(field_keys)
+                codes[field][i] = code
+        self._keys = {field: [*field_keys] for field, field_keys in keys.items()}
+        self._codes = codes
+        self._scalars = scalars
+        self._indexes = {}
+
+    def _subset(self, indices):
+        report = DiffReport.__new__(DiffReport)
+        list.__init__(report, (self[i] for i in indices.tolist()))
+        report.x = self.x[indices]
+        report.values = [self.values[i] for i in indices.tolist()]
+        report._keys = self._keys
+        report._codes = {field: codes[indices] for field, codes in self._codes.items()}
+        report._scalars = self._scalars[:, indices]
+        report._indexes = {}
+        return report
+
+    def keys(self, by):
+        """
+        Get the distinct keys of the differences, in order of appearance, such as the
+        names of the sections with a difference for ``by="section"``.
+
+        :param by: One of ``"type"``, ``"section"``, ``"cell"``, ``"mechanism"`` or
+          ``"parameter"``.
+        """
+        return [*self.index(by)]
+
+    def index(self, by):
+        """
+        Get the positions of the differences per key, in order of appearance.
+
+        :param by: The field to index by, see :meth:`keys`.
+        :returns: A dictionary of the keys to arrays of positions.
+        """
+        index = self._indexes.get(by)
+        if index is None:
+            codes = self._get_codes(by)
+            if not len(codes):
+                self._indexes[by] = {}
+                return {}
+            # Sort stably by code, and split into the runs of each code.
+            order = _np.argsort(codes, kind="stable")
+            sorted_codes = codes[order]
+            starts = _np.flatnonzero(_np.diff(sorted_codes, prepend=-1))
+            groups = _np.split(order, starts[1:])
+            keys = self._keys[by]
+            groups.sort(key=lambda group: group[0])
+            index = self._indexes[by] = {keys[codes[g[0]]]: g for g in groups}
+        return index
+
+    def filter(self, type=None, **keys):
+        """
+        Get a report of the differences that match all given keys.
+
+        :param type: Difference types, or their names, of which the differences are
+          instances.
+        :param keys: The keys of the other fields, such as ``parameter="g_pas"``.
+          Multiple keys are given as a list, tuple or set.
+        """
+        mask = _np.ones(len(self), dtype=bool)
+        if type is not None:
+            mask &= self._match_types(type)
+        for field, wanted in keys.items():
+            if field == "type" or field not in FIELDS:
+                raise TypeError(f"Can't filter differences by '{field}'.")
+            if not isinstance(wanted, (list, tuple, set, frozenset)):
+                wanted = (wanted,)
+            key_codes = [
+                code for code, key in enumerate(self._keys[field]) if key in wanted
+            ]
+            mask &= _np.isin(self._get_codes(field), key_codes)
+        return self._subset(_np.flatnonzero(mask))
+
+    def group_by(self, by):
+        """
+        Split the report into a report per key, in order of appearance.
+
+        :param by: The field to group by, see :meth:`keys`.
+        """
+        return {key: self._subset(indices) for key, indices in self.index(by).items()}
+
+    def counts(self, by="type"):
+        """
+        Get the number of differences per key, in order of appearance.
+        """
+        return {key: len(indices) for key, indices in self.index(by).items()}
+
+    def scalar_values(self):
+        """
+        Get the values of each difference on each side as arrays, with NaN for values
+        that aren't numbers, such as arrays or lists of objects.
+        """
+        return self._scalars[0].copy(), self._scalars[1].copy()
+
+    def deltas(self, relative=False):
+        """
+        Get the change from the left to the right value of each difference, or NaN if
+        the values aren't numbers.
+
+        :param relative: Divide the changes by the magnitude of the left values.
+        """
+        left, right = self._scalars
+        delta = right - left
+        if relative:
+            with _np.errstate(divide="ignore", invalid="ignore"):
+                delta = delta / _np.abs(left)
+        return delta
+
+    def aggregate(self, by, stat="max", relative=False):
+        """
+        Summarize the absolute changes of the differences per key, ignoring the
+        differences that don't have numeric values. For example, the maximum deviation
+        of the length of the sections per cell is
+        ``report.filter(SectionLengthDifference).aggregate("cell")``.
+
+        :param by: The field to group by, see :meth:`keys`.
+        :param stat: One of ``"max"``, ``"min"``, ``"mean"``, ``"sum"`` or ``"count"``.
+        :param relative: Summarize the relative changes, see :meth:`deltas`.
+        :returns: A dictionary of the keys to their statistic, NaN if none of the
+          differences of a key have numeric values.
+        """
+        if stat not in _STATS:
+            raise ValueError(f"Unknown statistic '{stat}', choose from {_STATS}.")
+        delta = _np.abs(self.deltas(relative=relative))
+        index = self.index(by)
+        if not index:
+            return {}
+        order = _np.concatenate([*index.values()])
+        starts = _np.cumsum([0, *(len(indices) for indices in index.values())])[:-1]
+        delta = delta[order]
+        valid = ~_np.isnan(delta)
+        count = _np.add.reduceat(valid.astype(_np.intp), starts)
+        if stat == "count":
+            result = count.astype(float)
+        elif stat in ("sum", "mean"):
+            result = _np.add.reduceat(_np.where(valid, delta, 0), starts)
+            if stat == "mean":
+                with _np.errstate(divide="ignore", invalid="ignore"):
+                    result = result / count
+        else:
+            # `fmax` and `fmin` skip NaN, unless all values are NaN.
+            reduce = _np.fmax if stat == "max" else _np.fmin
+            result = reduce.reduceat(delta, starts)
+        if stat != "count":
+            result = _np.where(count > 0, result, _np.nan)
+        return dict(zip(index, result.tolist()))
+
+    def _get_codes(self, by):
+        try:
+            return self._codes[by]
+        except KeyError:
+            raise ValueError(
+                f"Can't index differences by '{by}', choose from {FIELDS}."
+            ) from None
+
+    def _match_types(self, types):
+        if not isinstance(types, (list, tuple, set, frozenset)):
+            types = (types,)
+        names = {t for t in types if isinstance(t, str)}
+        classes = tuple(t for t in types if not isinstance(t, str))
+        matched = [
+            code
+            for code, t in enumerate(self._keys["type"])
+            if t.__name__ in names or issubclass(t, classes)
+        ]
+        return _np.isin(self._codes["type"], matched)
+
+
+def _own(values):
+    # Arrays can be views of NEURON's memory, such as the data of a Vector, so keep a
+    # copy that stays valid after the object changes.
+    if isinstance(values, _np.ndarray):
+        return values.copy()
+    if isinstance(values, (tuple, list)):
+        return type(values)(_own(value) for value in values)
+    return values
+
+
+def _scalar(value):
+    if isinstance(value, (int, float, _np.integer, _np.floating)) and not isinstance(
+        value, bool
+    ):
+        return float(value)
+    return _np.nan
+
+
+def _locate(obj):
+    """
+    Get the section, segment location, mechanism and parameter of an object, or
+    ``None`` if it isn't part of a section.
+    """
+    if isinstance(obj, (_nrn.Section, SnapshotSection)):
+        return obj, _np.nan, None, None
+    if isinstance(obj, (_nrn.Segment, SnapshotSegment)):
+        return obj.sec, obj.x, None, None
+    if isinstance(obj, (_nrn.Mechanism, SnapshotMechanism)):
+        seg = obj.segment()
+        return seg.sec, seg.x, obj.name(), None
+    if isinstance(obj, (_nrn.RangeVar, SnapshotRangeVar)):
+        mech = obj.mech()
+        seg = mech.segment()
+        return seg.sec, seg.x, mech.name(), obj.name()
+    if isinstance(obj, _hoc.HocObject):
+        # Point processes are located at their segment, artificial cells aren't.
+        get_segment = getattr(obj, "get_segment", None)
+        seg = None if get_segment is None else get_segment()
+        if seg is not None:
+            return seg.sec, seg.x, template_name(obj), None
+    return None
+
+
+def _get_cell(sec, cells):
+    cell = cells.get(sec)
+    if cell is None:
+        path = [sec]
+        parent = _get_parent(sec)
+        while parent is not None and parent not in cells:
+            path.append(parent)
+            parent = _get_parent(parent)
+        cell = path[-1].name() if parent is None else cells[parent]
+        for visited in path:
+            cells[visited] = cell
+    return cell
@@ -0,0 +1,209 @@
+"""
+Incremental diffs of a candidate model that changes, against a fixed reference.
+
+The sections that changed since the previous refresh are either marked by the caller,
+or found by capturing the candidate into arrays and comparing them to the previous
+capture. Point processes are listed per type, and compared separately. Only the digests
+of the changed sections and their ancestors are recomputed, and only the pairs of root
+sections whose digests changed are walked again, skipping their unchanged subtrees.
+"""
+
+import numpy as _np
+from neuron import h as _h, nrn as _nrn
+from ._differences import _get_point_process_parameters, _values_differ
+from ._differs import ModelDiffer, _get_point_process_types
+from ._digest import DigestCache
+from ._models import Model
+from ._snapshot import Snapshot, capture_arrays, order_sections
+
+# Arrays of the layout of a snapshot, if any of them changed, the structure did.
+_LAYOUT_KEYS = (
+    "sec.name",
+    "sec.parent",
+    "sec.children",
+    "sec.children.offset",
+    "sec.nseg",
+    "pt3d.offset",
+    "seg.offset",
+    "mech.name",
+    "mech.file",
+    "mech.present",
+    "var.mech",
+    "var.name",
+    "var.offset",
+)
+
+
+class DiffSession:
+    """
+    Repeated diffs of a live candidate model against a live reference model, such as
+    during model fitting. Call :meth:`refresh` after each change of the candidate to get
+    the updated differences. The reference must not change during the session.
+
+    The models can be given as sections or iterables of sections, which are indexed as
+    a :class:`~nrndiff.Model` and diffed as in :func:`~nrndiff.nrn_diff_models`.
+
+    Changes are found by comparing the values that a snapshot captures, and the
+    parameters of the point processes. Large candidates are refreshed faster when the
+    changed sections are marked with :meth:`mark_changed`, as they don't have to be
+    captured then.
+
+    :ivar walked: Number of pairs of root sections that the last refresh walked.
+    """
+
+    def __init__(self, reference, candidate):
+        if any(
+            isinstance(model.source if isinstance(model, Model) else model, Snapshot)
+            for model in (reference, candidate)
+        ):
+            raise TypeError("Can't track changes of snapshots, diff live models.")
+        self._single = isinstance(reference, _nrn.Section)
+        self._reference = reference if self._single else Model(reference)
+        self._candidate = candidate
+        self._reference_digests = DigestCache()
+        self._candidate_digests = DigestCache()
+        self._sections = None
+        self._arrays = None
+        self._point_processes = None
+        self._marked = set()
+        self._structure = None
+        self._pairing = None
+        self._reports = {}
+        self.walked = 0
+
+    def __repr__(self):
+        return f"<DiffSession of {self._reference} and {self._candidate}>"
+
+    def mark_changed(self, *sections):
+        """
+        Mark sections of the candidate as changed since the last refresh. If any
+        sections are marked, the next :meth:`refresh` trusts the marks instead of
+        capturing the candidate to find the changed sections, so every changed section
+        must be marked. Changed point processes and added or removed sections are found
+        either way.
+        """
+        self._marked.update(sections)
+
+    def refresh(self, full=False):
+        """
+        Diff the candidate against the reference, only walking the parts of the
+        candidate that changed since the last refresh.
+
+        :param full: Diff the whole candidate again.
+        :returns: A :class:`~nrndiff.DiffReport` of the differences.
+        """
+        from . import iter_diff
+        from ._report import DiffReport
+
+        sections = order_sections(
+            self._candidate
+            if isinstance(self._candidate, _nrn.Section)
+            else [*self._candidate]
+        )
+        marked, self._marked = self._marked, set()
+        # A capture is only up to date if the previous refresh made one.
+        arrays = None if marked else capture_arrays(sections)
+        point_processes = _get_point_processes(sections)
+        structure = _h.CVode().structure_change_count()
+        changed = None
+        if not full and sections == self._sections and structure == self._structure:
+            if marked:
+                changed = {sec for sec in sections if sec in marked}
+            elif self._arrays is not None:
+                changed = _get_changed_sections(self._arrays, arrays)
+                if changed is not None:
+                    changed = {sections[i] for i in changed.tolist()}
+        if changed is None:
+            self._candidate_digests.clear()
+            self._pairing = None
+            self._reports = {}
+        else:
+            changed.update(
+                sec
+                for sec in {*self._point_processes, *point_processes}
+                if self._point_processes.get(sec) != point_processes.get(sec)
+            )
+            for sec in changed:
+                self._candidate_digests.discard(sec)
+        self._sections, self._arrays, self._structure = sections, arrays, structure
+        self._point_processes = point_processes
+        if self._pairing is None:
+            self._pairing = self._pair(sections)
+        diffs, pairs = self._pairing
+        report = [*diffs]
+        reports = {}
+        self.walked = 0
+        for pair in pairs:
+            digest = self._candidate_digests.digest(pair[1])
+            previous = self._reports.get(pair)
+            if previous is not None and previous[0] == digest:
+                differences = previous[1]
+            else:
+                differences = [
+                    *iter_diff(
+                        *pair,
+                        digests=(self._reference_digests, self._candidate_digests),
+                    )
+                ]
+                self.walked += 1
+            reports[pair] = (digest, differences)
+            report.extend(differences)
+        self._reports = reports
+        return DiffReport(report)
+
+    def _pair(self, sections):
+        if self._single:
+            return [], [(self._reference, self._candidate)]
+        differ = ModelDiffer(self._reference, Model(sections), None)
+        return differ.get_diff(), differ.get_children()
+
+
+def _get_point_processes(sections):
+    """
+    Get the location, type and parameters of the point processes of each section that
+    has any. The point processes are listed per type, so that the segments without
+    point processes aren't visited.
+    """
+    included = set(sections)
+    point_processes = {}
+    for name in sorted(_get_point_process_types()):
+        for point_process in _h.List(name):
+            # Artificial cells have no segment.
+            get_segment = getattr(point_process, "get_segment", None)
+            seg = None if get_segment is None else get_segment()
+            if seg is None or seg.sec not in included:
+                continue
+            parameters = _get_point_process_parameters(point_process)
+            point_processes.setdefault(seg.sec, []).append(
+                (seg.x, name, tuple(parameters.values()))
+            )
+    return {sec: sorted(state) for sec, state in point_processes.items()}
+
+
+def _get_changed_sections(previous, arrays):
+    """
+    Get the indices of the sections whose values differ between two captures of the
+    same sections, or ``None`` if the layout of the captures differs.
+    """
+    for key in _LAYOUT_KEYS:
+        if not _np.array_equal(previous[key], arrays[key]):
+            return None
+    nsec = len(arrays["sec.nseg"])
+    changed = _np.zeros(nsec, dtype=bool)
+    for key in ("sec.L", "sec.diam", "sec.Ra", "sec.cm", "sec.v"):
+        changed |= _values_differ(previous[key], arrays[key])
+    # Map the rows of points and segments to their sections.
+    for key, rows in (
+        ("pt3d", _values_differ(previous["pt3d"], arrays["pt3d"]).any(axis=1)),
+        ("seg", _get_changed_segments(previous, arrays)),
+    ):
+        owners = _np.repeat(_np.arange(nsec), _np.diff(arrays[f"{key}.offset"]))
+        changed[owners[rows]] = True
+    return _np.flatnonzero(changed)
+
+
+def _get_changed_segments(previous, arrays):
+    changed = _values_differ(previous["var.values"], arrays["var.values"]).any(axis=1)
+    for key in ("seg.x", "seg.area", "seg.volume", "seg.ri", "seg.v"):
+        changed |= _values_differ(previous[key], arrays[key])
+    return changed
@@ -0,0 +1,604 @@
+"""
+Columnar snapshots of NEURON models.
+
+A snapshot stores every value that the differs compare in flat NumPy arrays, so that a
+model can be captured once, saved to disk and diffed later against a live model or
+another snapshot. The proxy classes in this module mimic the parts of the NEURON API
+that the differs use, so snapshots are walked by the same `Differ` classes as live
+objects.
+"""
+
+import pathlib as _pathlib
+import warnings as _warnings
+import numpy as _np
+from neuron import nrn as _nrn, h as _h
+from ._util import ranges
+
+_SECTION_ATTRS = ("L", "diam", "Ra", "cm", "v")
+_SEGMENT_ATTRS = ("x", "area", "volume", "ri", "v")
+
+
+class Snapshot:
+    """
+    Columnar capture of a set of sections, their 3D points, segments, mechanisms and
+    range variables. Use :meth:`capture` to create one from live sections, and
+    :meth:`save`/:meth:`load` to store it as an ``.npz`` file or as a directory of
+    ``.npy`` files that can be memory mapped.
+    """
+
+    def __init__(self, arrays):
+        self._arrays = arrays
+        self._mech_index = {str(name): i for i, name in enumerate(arrays["mech.name"])}
+        self._var_index = {
+            (int(mech), str(name)): i
+            for i, (mech, name) in enumerate(
+                zip(arrays["var.mech"], arrays["var.name"])
+            )
+        }
+
+    def __len__(self):
+        return len(self._arrays["sec.name"])
+
+    def __repr__(self):
+        return f"<Snapshot of {len(self)} sections>"
+
+    def __getitem__(self, key):
+        return self._arrays[key]
+
+    def keys(self):
+        return self._arrays.keys()
+
+    @property
+    def sections(self):
+        return [SnapshotSection(self, i) for i in range(len(self))]
+
+    @property
+    def roots(self):
+        return [
+            SnapshotSection(self, i)
+            for i in _np.flatnonzero(self._arrays["sec.parent"] < 0)
+        ]
+
+    def subtree(self, root):
+        """
+        Extract the subtree of a root section into a new snapshot, in which the root is
+        the first section. Sections are stored depth first, so a subtree is a contiguous
+        range of sections, segments and points.
+
+        :param root: Index of the root section.
+        """
+        arrays = self._arrays
+        start = int(root)
+        later = _np.flatnonzero(arrays["sec.parent"][start + 1 :] < 0)
+        stop = start + 1 + int(later[0]) if len(later) else len(self)
+        sec = slice(start, stop)
+        sliced = {}
+        for key in ("sec.children", "pt3d", "seg"):
+            offset = arrays[f"{key}.offset"][start : stop + 1]
+            sliced[key] = slice(int(offset[0]), int(offset[-1]))
+            sliced[f"{key}.offset"] = offset - offset[0]
+        parents = arrays["sec.parent"][sec] - start
+        parents[0] = -1
+        subtree = {
+            **{key: arrays[key] for key in arrays if key.startswith(("mech.", "var."))},
+            **{key: arrays[key][sec] for key in arrays if key.startswith("sec.")},
+            **{
+                key: arrays[key][sliced["seg"]]
+                for key in arrays
+                if key.startswith("seg.")
+            },
+            "sec.parent": parents,
+            "sec.children": arrays["sec.children"][sliced["sec.children"]] - start,
+            "pt3d": arrays["pt3d"][sliced["pt3d"]],
+            "mech.present": arrays["mech.present"][sliced["seg"]],
+            "var.values": arrays["var.values"][sliced["seg"]],
+            **{key: value for key, value in sliced.items() if key.endswith(".offset")},
+        }
+        return Snapshot(subtree)
+
+    @classmethod
+    def capture(cls, sections):
+        """
+        Capture a snapshot of the given sections. A single section captures its subtree.
+        Point processes aren't captured, so a warning is issued if there are any.
+        """
+        sections = order_sections(sections)
+        if has_point_processes(sections):
+            _warnings.warn(
+                "Snapshots don't capture point processes, differences between them "
+                "won't be reported.",
+                stacklevel=2,
+            )
+        return cls(capture_arrays(sections))
+
+    def save(self, path):
+        """
+        Save the snapshot. Paths ending in ``.npz`` are stored as a single NumPy
+        archive, any other path is stored as a directory of ``.npy`` files.
+        """
+        path = _pathlib.Path(path)
+        if path.suffix == ".npz":
+            _np.savez(path, **self._arrays)
+        else:
+            path.mkdir(parents=True, exist_ok=True)
+            for key, array in self._arrays.items():
+                _np.save(path / f"{key}.npy", array)
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        """
+        Load a snapshot. Directory snapshots can be opened with ``mmap=True`` to map the
+        arrays from disk instead of reading them into memory.
+        """
+        path = _pathlib.Path(path)
+        if path.is_dir():
+            mode = "r" if mmap else None
+            arrays = {
+                file.stem: _np.load(file, mmap_mode=mode)
+                for file in sorted(path.glob("*.npy"))
+            }
+        else:
+            if mmap:
+                raise ValueError(
+                    "`.npz` snapshots can't be memory mapped, "
+                    "save as a directory instead."
+                )
+            with _np.load(path) as archive:
+                arrays = {key: archive[key] for key in archive.files}
+        return cls(arrays)
+
+
+def order_sections(sections):
+    """
+    Order a section, which stands for its subtree, or an iterable of sections depth
+    first from their roots, in `children()` order, so that the order matches the walk.
+    """
+    if isinstance(sections, _nrn.Section):
+        roots = [sections]
+        included = set(sections.subtree())
+    else:
+        included = set(sections)
+        roots = [
+            sec
+            for sec in _ordered_unique(sections)
+            if sec.parentseg() is None or sec.parentseg().sec not in included
+        ]
+    ordered = []
+    stack = list(reversed(roots))
+    while stack:
+        sec = stack.pop()
+        ordered.append(sec)
+        stack.extend(reversed([child for child in sec.children() if child in included]))
+    return ordered
+
+
+def has_point_processes(sections):
+    """
+    Check whether any segment of the given sections has a point process.
+    """
+    return any(seg.point_processes() for sec in sections for seg in sec)
+
+
+def _ordered_unique(sections):
+    seen = set()
+    for sec in sections:
+        if sec not in seen:
+            seen.add(sec)
+            yield sec
+
+
+def capture_arrays(sections):
+    index = {sec: i for i, sec in enumerate(sections)}
+    parents = []
+    children = []
+    child_offset = [0]
+    points = []
+    pt_offset = [0]
+    npoints = 0
+    seg_attrs = {attr: [] for attr in _SEGMENT_ATTRS}
+    seg_offset = [0]
+    mech_names = {}
+    mech_vars = {}
+    var_keys = {}
+    var_sizes = []
+    seg_values = []
+    seg_mechs = []
+    for sec in sections:
+        parent = sec.parentseg()
+        parents.append(index.get(parent.sec, -1) if parent is not None else -1)
+        children.extend(index[child] for child in sec.children() if child in index)
+        child_offset.append(len(children))
+        points.append(get_points(sec))
+        npoints += len(points[-1])
+        pt_offset.append(npoints)
+        for seg in sec:
+            for attr in _SEGMENT_ATTRS:
+                value = getattr(seg, attr)
+                seg_attrs[attr].append(value() if callable(value) else value)
+            mechs = []
+            values = []
+            for mech in seg:
+                rangevars, mech_values, counts = get_parameters(mech)
+                mech_id = mech_names.get(mech.name())
+                if mech_id is None:
+                    # A mechanism type always has the same range variables.
+                    mech_id = mech_names[mech.name()] = len(mech_names)
+                    mech_vars[mech_id] = [
+                        *range(len(var_keys), len(var_keys) + len(rangevars))
+                    ]
+                    var_keys.update(((mech_id, rv.name()), None) for rv in rangevars)
+                    var_sizes.extend(counts)
+                mechs.append(mech_id)
+                values.extend(mech_values)
+            seg_mechs.append(mechs)
+            seg_values.append(values)
+        seg_offset.append(len(seg_values))
+    nseg = len(seg_values)
+    var_offset = _np.concatenate(([0], _np.cumsum(var_sizes, dtype=_np.int64)))
+    mech_columns = {
+        mech_id: ranges(var_offset[var_ids], _np.diff(var_offset)[var_ids])
+        for mech_id, var_ids in mech_vars.items()
+    }
+    present = _np.zeros((nseg, len(mech_names)), dtype=bool)
+    values = _np.full((nseg, var_offset[-1]), _np.nan)
+    for i, (mechs, vals) in enumerate(zip(seg_mechs, seg_values)):
+        present[i, mechs] = True
+        if mechs:
+            values[i, _np.concatenate([mech_columns[m] for m in mechs])] = vals
+    arrays = {
+        "sec.name": _np.array([sec.name() for sec in sections], dtype=str),
+        "sec.parent": _np.array(parents, dtype=_np.int64),
+        "sec.children": _np.array(children, dtype=_np.int64),
+        "sec.children.offset": _np.array(child_offset, dtype=_np.int64),
+        "sec.nseg": _np.array([sec.nseg for sec in sections], dtype=_np.int64),
+        **{
+            f"sec.{attr}": _np.array(
+                [getattr(sec, attr) for sec in sections], dtype=float
+            )
+            for attr in _SECTION_ATTRS
+        },
+        "pt3d": _np.concatenate([_np.empty((0, 4)), *points]),
+        "pt3d.offset": _np.array(pt_offset, dtype=_np.int64),
+        "seg.offset": _np.array(seg_offset, dtype=_np.int64),
+        **{
+            f"seg.{attr}": _np.array(vals, dtype=float)
+            for attr, vals in seg_attrs.items()
+        },
+        "mech.name": _np.array([*mech_names], dtype=str),
+        "mech.file": _np.array(
+            [getattr(_h, name).file for name in mech_names], dtype=str
+        ),
+        "mech.present": present,
+        "var.mech": _np.array([mech for mech, _ in var_keys], dtype=_np.int64),
+        "var.name": _np.array([name for _, name in var_keys], dtype=str),
+        "var.offset": var_offset,
+        "var.values": values,
+    }
+    return arrays
+
+
+def get_parameters(mech):
+    """
+    Get the range variables of a mechanism, a flat list of their values, and the number
+    of values of each variable, as array-valued range variables have several.
+    """
+    if isinstance(mech, SnapshotMechanism):
+        return mech._parameters()
+    rangevars = [*mech]
+    counts = [len(rv) for rv in rangevars]
+    return (
+        rangevars,
+        [rv[i] for rv, count in zip(rangevars, counts) for i in range(count)],
+        counts,
+    )
+
+
+def get_value(rangevar):
+    """
+    Get the value of a range variable, or an array of values if it is array-valued.
+    """
+    count = len(rangevar)
+    if count == 1:
+        return rangevar[0]
+    return _np.array([rangevar[i] for i in range(count)])
+
+
+_x3d = _nrn.Section.x3d
+_y3d = _nrn.Section.y3d
+_z3d = _nrn.Section.z3d
+_diam3d = _nrn.Section.diam3d
+
+
+def get_points(sec):
+    """
+    Get the 3D points of a section as an ``(n3d, 4)`` array of x, y, z and diam.
+    Snapshot sections return a view on the snapshot arrays.
+    """
+    if isinstance(sec, SnapshotSection):
+        return sec.points()
+    n3d = sec.n3d()
+    points = _np.empty((n3d, 4))
+    # NEURON has no bulk getter, but calling the method descriptors directly skips the
+    # attribute lookup on the section, which is most of the cost per point.
+    for col, getter in enumerate((_x3d, _y3d, _z3d, _diam3d)):
+        points[:, col] = [getter(sec, i) for i in range(n3d)]
+    return points
+
+
+class _SnapshotObject:
+    __slots__ = ("_snapshot", "_index")
+
+    def __init__(self, snapshot, index):
+        self._snapshot = snapshot
+        self._index = int(index)
+
+    def __eq__(self, other):
+        return (
+            type(other) is type(self)
+            and other._snapshot is self._snapshot
+            and other._index == self._index
+        )
+
+    def __hash__(self):
+        return hash((type(self), id(self._snapshot), self._index))
+
+    def __str__(self):
+        return self.name()
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self}>"
+
+
+class SnapshotSection(_SnapshotObject):
+    __slots__ = ()
+
+    def _array(self, key):
+        return self._snapshot[key][self._index]
+
+    def name(self):
+        return str(self._array("sec.name"))
+
+    @property
+    def L(self):
+        return float(self._array("sec.L"))
+
+    @property
+    def diam(self):
+        return float(self._array("sec.diam"))
+
+    @property
+    def Ra(self):
+        return float(self._array("sec.Ra"))
+
+    @property
+    def cm(self):
+        return float(self._array("sec.cm"))
+
+    @property
+    def v(self):
+        return float(self._array("sec.v"))
+
+    @property
+    def nseg(self):
+        return int(self._array("sec.nseg"))
+
+    def _range(self, key):
+        offset = self._snapshot[f"{key}.offset"]
+        return int(offset[self._index]), int(offset[self._index + 1])
+
+    def n3d(self):
+        start, stop = self._range("pt3d")
+        return stop - start
+
+    def _point(self, i, col):
+        start, _ = self._range("pt3d")
+        return float(self._snapshot["pt3d"][start + i, col])
+
+    def points(self):
+        start, stop = self._range("pt3d")
+        return self._snapshot["pt3d"][start:stop]
+
+    def x3d(self, i):
+        return self._point(i, 0)
+
+    def y3d(self, i):
+        return self._point(i, 1)
+
+    def z3d(self, i):
+        return self._point(i, 2)
+
+    def diam3d(self, i):
+        return self._point(i, 3)
+
+    def children(self):
+        start, stop = self._range("sec.children")
+        return [
+            SnapshotSection(self._snapshot, i)
+            for i in self._snapshot["sec.children"][start:stop]
+        ]
+
+    def parent(self):
+        parent = self._array("sec.parent")
+        return SnapshotSection(self._snapshot, parent) if parent >= 0 else None
+
+    def __iter__(self):
+        start, stop = self._range("seg")
+        return (SnapshotSegment(self._snapshot, i) for i in range(start, stop))
+
+
+class SnapshotSegment(_SnapshotObject):
+    __slots__ = ()
+
+    def _array(self, key):
+        return float(self._snapshot[key][self._index])
+
+    @property
+    def sec(self):
+        offset = self._snapshot["seg.offset"]
+        return SnapshotSection(
+            self._snapshot, _np.searchsorted(offset, self._index, side="right") - 1
+        )
+
+    def name(self):
+        return f"{self.sec.name()}({self.x})"
+
+    @property
+    def x(self):
+        return self._array("seg.x")
+
+    def area(self):
+        return self._array("seg.area")
+
+    def volume(self):
+        return self._array("seg.volume")
+
+    def ri(self):
+        return self._array("seg.ri")
+
+    @property
+    def v(self):
+        return self._array("seg.v")
+
+    def __iter__(self):
+        nmech = len(self._snapshot["mech.name"])
+        return (
+            SnapshotMechanism(self._snapshot, self._index * nmech + i)
+            for i in _np.flatnonzero(self._snapshot["mech.present"][self._index])
+        )
+
+    def __getattr__(self, attr):
+        snapshot = self._snapshot
+        mech_id = snapshot._mech_index.get(attr)
+        if mech_id is not None and snapshot["mech.present"][self._index, mech_id]:
+            return SnapshotMechanism(
+                snapshot, self._index * len(snapshot["mech.name"]) + mech_id
+            )
+        for mech in self:
+            var_id = snapshot._var_index.get((mech._mech_id, attr))
+            if var_id is not None:
+                return SnapshotRangeVar(
+                    snapshot, self._index * len(snapshot["var.name"]) + var_id
+                )._attr_value()
+        raise AttributeError(
+            f"'{type(self).__name__}' object has no attribute '{attr}'"
+        )
+
+
+class SnapshotMechanism(_SnapshotObject):
+    __slots__ = ()
+
+    @property
+    def _seg_id(self):
+        return self._index // len(self._snapshot["mech.name"])
+
+    @property
+    def _mech_id(self):
+        return self._index % len(self._snapshot["mech.name"])
+
+    def name(self):
+        return str(self._snapshot["mech.name"][self._mech_id])
+
+    @property
+    def file(self):
+        return str(self._snapshot["mech.file"][self._mech_id])
+
+    def segment(self):
+        return SnapshotSegment(self._snapshot, self._seg_id)
+
+    def _var_ids(self):
+        return _np.flatnonzero(self._snapshot["var.mech"] == self._mech_id)
+
+    def _parameters(self):
+        snapshot = self._snapshot
+        var_ids = self._var_ids()
+        nvar = len(snapshot["var.name"])
+        offset = snapshot["var.offset"]
+        counts = _np.diff(offset)[var_ids]
+        columns = ranges(offset[var_ids], counts)
+        return (
+            [SnapshotRangeVar(snapshot, self._seg_id * nvar + i) for i in var_ids],
+            snapshot["var.values"][self._seg_id, columns].tolist(),
+            counts.tolist(),
+        )
+
+    def __iter__(self):
+        nvar = len(self._snapshot["var.name"])
+        return (
+            SnapshotRangeVar(self._snapshot, self._seg_id * nvar + i)
+            for i in self._var_ids()
+        )
+
+    def __getattr__(self, attr):
+        # Mechanism attributes are named without the mechanism suffix, like on `nrn`.
+        var_id = self._snapshot._var_index.get((self._mech_id, f"{attr}_{self.name()}"))
+        if var_id is None:
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{attr}'"
+            )
+        return SnapshotRangeVar(
+            self._snapshot, self._seg_id * len(self._snapshot["var.name"]) + var_id
+        )._attr_value()
+
+
+class SnapshotRangeVar(_SnapshotObject):
+    __slots__ = ()
+
+    @property
+    def _var_id(self):
+        return self._index % len(self._snapshot["var.name"])
+
+    def name(self):
+        return str(self._snapshot["var.name"][self._var_id])
+
+    def _columns(self):
+        offset = self._snapshot["var.offset"]
+        return int(offset[self._var_id]), int(offset[self._var_id + 1])
+
+    def __len__(self):
+        start, stop = self._columns()
+        return stop - start
+
+    def __getitem__(self, i):
+        start, stop = self._columns()
+        if not 0 <= i < stop - start:
+            raise IndexError(f"{self.name()} index out of range")
+        seg_id = self._index // len(self._snapshot["var.name"])
+        return float(self._snapshot["var.values"][seg_id, start + i])
+
+    def _attr_value(self):
+        # Like NEURON, attribute access gives scalars, or the range variable of arrays.
+        return self[0] if len(self) == 1 else self
+
+    def mech(self):
+        nvar = len(self._snapshot["var.name"])
+        nmech = len(self._snapshot["mech.name"])
+        seg_id = self._index // nvar
+        return SnapshotMechanism(
+            self._snapshot,
+            seg_id * nmech + int(self._snapshot["var.mech"][self._var_id]),
+        )
+
+
+def coerce_pair(left, right):
+    """
+    When only one side of a diff is a snapshot, capture the live side so that both sides
+    can be walked as snapshots. The point processes of the live side are then not
+    compared, see :meth:`Snapshot.capture`.
+    """
+    if isinstance(left, Snapshot) and not isinstance(right, Snapshot):
+        right = _capture_live(right)
+    elif isinstance(right, Snapshot) and not isinstance(left, Snapshot):
+        left = _capture_live(left)
+    return left, right
+
+
+def _capture_live(obj):
+    if isinstance(obj, _nrn.Section):
+        return Snapshot.capture(obj)
+    try:
+        sections = list(obj)
+    except TypeError:
+        return obj
+    if all(isinstance(sec, _nrn.Section) for sec in sections):
+        return Snapshot.capture(sections)
+    return obj
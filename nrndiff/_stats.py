@@ -0,0 +1,129 @@
+"""
+Optional instrumentation of the walk of a diff, with counts and times per differ and
+difference class, and hooks that are called on each visited node.
+"""
+
+import collections as _collections
+import time as _time
+import weakref as _weakref
+
+
+class DiffStats:
+    """
+    Statistics of a diff. Pass an instance as the `stats` argument of
+    :func:`~nrndiff.nrn_diff` or :func:`~nrndiff.iter_diff` to have it filled in during
+    the walk. Without it, the walk isn't instrumented.
+
+    Times are in seconds. The time of a `Differ` class covers the whole visit of its
+    nodes, including the type check, the evaluation of the differences and the lookup
+    of the children. Nodes without a differ are counted as `TypeDiffer`. The time spent
+    hashing the children into the memo is also reported separately as `hash_time`, and
+    the time spent comparing subtree digests, before the nodes are visited, as
+    `digest_time`.
+
+    The depth of a node is the number of nodes on the path of the walk to it, and the
+    stack size is the number of nodes waiting to be visited.
+
+    :param on_enter: Called as ``on_enter(left, right, parent)`` when a node is visited,
+      with the parent differ, or ``None`` for the first node.
+    :param on_exit: Called as ``on_exit(left, right, differ, diffs)`` when a node has
+      been diffed, with the differ of the node, or ``None`` if it has none, and its
+      differences.
+    """
+
+    def __init__(self, on_enter=None, on_exit=None):
+        self.on_enter = on_enter
+        self.on_exit = on_exit
+        self.nodes = 0
+        self.differ_counts = _collections.Counter()
+        self.differ_times = _collections.Counter()
+        self.difference_counts = _collections.Counter()
+        self.difference_times = _collections.Counter()
+        self.memo_size = 0
+        self.max_depth = 0
+        self.max_stack_size = 0
+        self.hash_time = 0.0
+        self.digest_time = 0.0
+        self.gc_time = 0.0
+        self._start = None
+        self._depth = 0
+        # Depth of the differs that have children waiting on the stack.
+        self._depths = _weakref.WeakKeyDictionary()
+
+    def __repr__(self):
+        return (
+            f"<DiffStats of {self.nodes} nodes in {self.time:.3f}s,"
+            f" memo size {self.memo_size}, max depth {self.max_depth},"
+            f" max stack size {self.max_stack_size}>"
+        )
+
+    @property
+    def time(self):
+        """
+        Total time spent visiting nodes.
+        """
+        return sum(self.differ_times.values())
+
+    def as_dict(self):
+        return {
+            "nodes": self.nodes,
+            "time": self.time,
+            "differ_counts": dict(self.differ_counts),
+            "differ_times": dict(self.differ_times),
+            "difference_counts": dict(self.difference_counts),
+            "difference_times": dict(self.difference_times),
+            "memo_size": self.memo_size,
+            "max_depth": self.max_depth,
+            "max_stack_size": self.max_stack_size,
+            "hash_time": self.hash_time,
+            "digest_time": self.digest_time,
+            "gc_time": self.gc_time,
+        }
+
+    def _subtrees_match(self, caches, left, right):
+        from ._digest import subtrees_match
+
+        start = _time.perf_counter()
+        match = subtrees_match(caches, left, right)
+        self.digest_time += _time.perf_counter() - start
+        return match
+
+    def _enter(self, left, right, parent):
+        self._depth = 1 if parent is None else self._depths[parent] + 1
+        self.max_depth = max(self.max_depth, self._depth)
+        if self.on_enter is not None:
+            self.on_enter(left, right, parent)
+        self._start = _time.perf_counter()
+
+    def _evaluate(self, differ):
+        # Like `Differ.get_diff`, but timing each difference.
+        diffs = []
+        for difference in differ.possible_differences:
+            start = _time.perf_counter()
+            different = difference.is_different()
+            name = difference.name
+            self.difference_times[name] += _time.perf_counter() - start
+            self.difference_counts[name] += 1
+            if different:
+                diffs.append(difference)
+        return diffs
+
+    def _visit(self, memo, differ):
+        # Like `Memo.visit`, but timing the hashing of the children.
+        children = differ.get_children()
+        start = _time.perf_counter()
+        visited = [*memo.visit(children)]
+        self.hash_time += _time.perf_counter() - start
+        if visited:
+            self._depths[differ] = self._depth
+        return visited
+
+    def _exit(self, left, right, differ, diffs, memo_size, stack_size):
+        name = type(differ).__name__ if differ is not None else "TypeDiffer"
+        self.differ_times[name] += _time.perf_counter() - self._start
+        self.differ_counts[name] += 1
+        self.nodes += 1
+        self.memo_size = memo_size
+        self.max_stack_size = max(self.max_stack_size, stack_size)
+        if self.on_exit is not None:
+            self.on_exit(left, right, differ, diffs)
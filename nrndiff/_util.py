@@ -1,7 +1,221 @@
-class Memo(set):
+import numpy as _np
+from neuron import nrn as _nrn
+from . import _patches
+
+
+class Memo:
+    """
+    Set of the nodes that a walk has visited. Sections, segments, mechanisms and range
+    variables, live or in snapshots, are stored as bits in an array per section or per
+    snapshot, so that the memo holds no references to them and their wrappers are freed
+    once the walk is done with them. Other objects are stored as they are.
+    """
+
+    def __init__(self, visited=()):
+        from ._snapshot import (
+            SnapshotSection,
+            SnapshotSegment,
+            SnapshotMechanism,
+            SnapshotRangeVar,
+        )
+
+        # The range variable type is only known once the patches are applied.
+        _patches.apply()
+        # Bit arrays of the visited nodes, per section or per snapshot and type.
+        self._bits = {}
+        # Rows of the bit arrays of the sections, per mechanism and range variable name.
+        self._rows = {}
+        self._var_rows = {}
+        # Number of segments per section, which is slow to get from NEURON.
+        self._nseg = {}
+        self._objects = set()
+        self._size = 0
+        self._locators = {
+            _nrn.Section: _locate_section,
+            _nrn.Segment: self._locate_segment,
+            _nrn.Mechanism: self._locate_mechanism,
+            _nrn.RangeVar: self._locate_rangevar,
+            SnapshotSection: _locate_snapshot_object,
+            SnapshotSegment: _locate_snapshot_object,
+            SnapshotMechanism: _locate_snapshot_object,
+            SnapshotRangeVar: _locate_snapshot_object,
+        }
+        for obj in visited:
+            self.add(obj)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, obj):
+        locate = self._locators.get(type(obj))
+        if locate is None:
+            return obj in self._objects
+        key, bit = locate(obj, None)
+        bits = self._bits.get(key)
+        byte = bit >> 3
+        return (
+            bits is not None and byte < len(bits) and bool(bits[byte] >> (bit & 7) & 1)
+        )
+
+    def add(self, obj):
+        """
+        Add a node to the memo.
+
+        :returns: Whether the node was not visited before.
+        """
+        return self._add(obj, None)
+
+    def _add(self, obj, nodes):
+        locate = self._locators.get(type(obj))
+        if locate is None:
+            if obj in self._objects:
+                return False
+            self._objects.add(obj)
+            self._size += 1
+            return True
+        key, bit = locate(obj, nodes)
+        bits = self._bits.get(key)
+        if bits is None:
+            bits = self._bits[key] = bytearray()
+        byte = bit >> 3
+        if byte >= len(bits):
+            bits.extend(bytes(byte + 1 - len(bits)))
+        mask = 1 << (bit & 7)
+        if bits[byte] & mask:
+            return False
+        bits[byte] |= mask
+        self._size += 1
+        return True
+
     def visit(self, children):
-        for (left, right) in children:
-            if left not in self and right not in self:
+        add = self._add
+        # The children of a pair are mostly on the same few segments, so cache the
+        # location of each segment's node for the duration of the call, during which
+        # the children keep the segments alive.
+        nodes = {}
+        for left, right in children:
+            # Add both sides, so that each child is located only once.
+            added_left = add(left, nodes)
+            added_right = add(right, nodes)
+            # Only yield pairs of which neither side was visited before.
+            if added_left and (added_right or left == right):
                 yield left, right
-            self.add(left)
-            self.add(right)
+
+    # The bits of a section are the section itself, followed by a row of the nodes of
+    # its segments, and a row for each mechanism and range variable.
+    def _locate_node(self, seg, nodes):
+        # The hash of a segment is the address of its node, so while the segment is
+        # alive, it identifies the node.
+        if nodes is not None:
+            node = nodes.get(hash(seg))
+            if node is not None:
+                return node
+        sec = _seg_sec(seg)
+        key = hash(sec)
+        nseg = self._nseg.get(key)
+        if nseg is None:
+            # The number of segments is slow to get from NEURON.
+            nseg = self._nseg[key] = sec.nseg
+        node = key, nseg, 1 + _node(_seg_x(seg), nseg)
+        if nodes is not None:
+            nodes[hash(seg)] = node
+        return node
+
+    def _locate_segment(self, seg, nodes):
+        key, _, bit = self._locate_node(seg, nodes)
+        return key, bit
+
+    def _locate_mechanism(self, mech, nodes):
+        key, nseg, bit = self._locate_node(_mech_segment(mech), nodes)
+        name = _mech_name(mech)
+        row = self._rows.get(name)
+        if row is None:
+            row = self._rows[name] = self._new_row()
+        return key, bit + row * (nseg + 2)
+
+    def _locate_rangevar(self, rangevar, nodes):
+        key, nseg, bit = self._locate_node(
+            _mech_segment(_patches._rangevar_mech(rangevar)), nodes
+        )
+        # The range variable name includes the mechanism suffix, so it has a row of its
+        # own without the name of the mechanism, which is slow to get.
+        name = _patches._rangevar_name(rangevar)
+        row = self._var_rows.get(name)
+        if row is None:
+            row = self._var_rows[name] = self._new_row()
+        return key, bit + row * (nseg + 2)
+
+    def _new_row(self):
+        # Row 0 holds the segments.
+        return len(self._rows) + len(self._var_rows) + 1
+
+
+# Attribute lookups on NEURON objects first search their range variables, so use the
+# descriptors directly.
+_seg_sec = _nrn.Segment.sec.__get__
+_seg_x = _nrn.Segment.x.__get__
+_mech_segment = _nrn.Mechanism.segment
+_mech_name = _nrn.Mechanism.name
+
+
+def _node(x, nseg):
+    # Index of the node of `x` among the nodes of a section, with the end nodes at 0 and
+    # `nseg + 1`, so that segments of the same node share it, as they're equal.
+    if x <= 0:
+        return 0
+    if x >= 1:
+        return nseg + 1
+    node = int(x * nseg) + 1
+    return node if node <= nseg else nseg
+
+
+def _locate_section(sec, nodes):
+    return hash(sec), 0
+
+
+def _locate_snapshot_object(obj, nodes):
+    # Snapshot objects are indexed in their snapshot already.
+    return (type(obj), id(obj._snapshot)), obj._index
+
+
+def match_pairs(left, right, keys):
+    """
+    Hash join the items of `left` and `right`. The items are matched by each pair of
+    left and right key functions in turn, and items with equal keys are paired in order.
+
+    :returns: The matched pairs, and the unmatched items on each side, in order.
+    """
+    left = [*left]
+    right = [*right]
+    pairs = []
+    for left_key, right_key in keys:
+        index = {}
+        for i, item in enumerate(right):
+            index.setdefault(right_key(item), []).append(i)
+        for bucket in index.values():
+            bucket.reverse()
+        matched = set()
+        unmatched = []
+        for item in left:
+            bucket = index.get(left_key(item))
+            if bucket:
+                r = bucket.pop()
+                matched.add(r)
+                pairs.append((item, right[r]))
+            else:
+                unmatched.append(item)
+        left = unmatched
+        right = [item for i, item in enumerate(right) if i not in matched]
+    return pairs, left, right
+
+
+def ranges(starts, counts):
+    """
+    Concatenate ``arange(start, start + count)`` for each start and count.
+    """
+    counts = _np.asarray(counts, dtype=_np.int64)
+    total = int(counts.sum())
+    if not total:
+        return _np.zeros(0, dtype=_np.int64)
+    offsets = _np.cumsum(counts) - counts
+    return _np.repeat(_np.asarray(starts) - offsets, counts) + _np.arange(total)
@@ -0,0 +1,36 @@
+"""
+Models and helpers shared by the tests.
+"""
+
+from neuron import h
+
+
+def make_cell(prefix=None, n=7, mechanisms=("pas",), nseg=3, points=False, chain=False):
+    """
+    Make a cell of `n` sections, connected as a binary tree, or as a chain. The sections
+    are named ``sec<i>``, prefixed with ``<prefix>.`` if a prefix is given.
+
+    :param points: Give each section two 3D points.
+    """
+    secs = [
+        h.Section(name=f"sec{i}" if prefix is None else f"{prefix}.sec{i}")
+        for i in range(n)
+    ]
+    for i, sec in enumerate(secs[1:], start=1):
+        sec.connect(secs[i - 1 if chain else (i - 1) // 2])
+    for sec in secs:
+        sec.nseg = nseg
+        for mechanism in mechanisms:
+            sec.insert(mechanism)
+        if points:
+            sec.pt3dadd(0, 0, 0, 1)
+            sec.pt3dadd(10, 0, 0, 1)
+    return secs
+
+
+def diff_keys(diffs):
+    """
+    Get the names and labels of differences, sorted, to compare diffs independent of
+    the order in which the differences were found.
+    """
+    return sorted((d.name, d.get_labels()) for d in diffs)
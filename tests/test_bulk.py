@@ -0,0 +1,112 @@
+import unittest
+from functools import partial
+
+from neuron import h
+
+from nrndiff import nrn_diff, nrn_diff_bulk, Snapshot
+from nrndiff import _differences
+
+from helpers import make_cell, diff_keys
+
+_make_cell = partial(make_cell, n=10, mechanisms=("pas", "hh"), points=True)
+
+
+class TestBulkDiff(unittest.TestCase):
+    def assertSameDiff(self, left, right):
+        expected = nrn_diff(left, right)
+        actual = nrn_diff_bulk(left, right)
+        self.assertEqual(
+            diff_keys(expected), diff_keys(actual), "bulk should match nrn_diff"
+        )
+        return actual
+
+    def test_bulk_nodiff(self):
+        a = _make_cell()
+        b = _make_cell()
+        self.assertEqual([], nrn_diff_bulk(a[0], b[0]), "no diff expected")
+
+    def test_bulk_attr_diff(self):
+        for attr in ("Ra", "cm", "v", "nseg"):
+            with self.subTest(attr=attr):
+                a = _make_cell()
+                b = _make_cell()
+                v = getattr(b[3], attr)
+                setattr(b[3], attr, v**2 + v + 10)
+                diff = self.assertSameDiff(a[0], b[0])
+                self.assertTrue(diff, f"Modified {attr} should not be identical")
+
+    def test_bulk_param_diff(self):
+        a = _make_cell()
+        b = _make_cell()
+        b[4].gnabar_hh = 0.5
+        b[7](0.5).e_pas = 10
+        diff = self.assertSameDiff(a[0], b[0])
+        self.assertEqual(4, len(diff), "3 gnabar and 1 e_pas diff expected")
+        for d in diff:
+            self.assertIsInstance(d, _differences.ParameterDifference)
+            self.assertIsInstance(d.differ.parent.parent.parent.left, type(a[0]))
+
+    def test_bulk_array_param_diff(self):
+        a = _make_cell()
+        b = _make_cell()
+        for sec in a + b:
+            sec.insert("extracellular")
+        b[2](0.5).xg[1] = 5
+        b[3](0.5).ena = 60
+        diff = self.assertSameDiff(a[0], b[0])
+        self.assertEqual(["xg", "ena"], [d.left.name() for d in diff])
+
+    def test_bulk_structure_diff(self):
+        a = _make_cell()
+        b = _make_cell()
+        b[6].pt3dchange(1, 5, 0, 0, 1)
+        b[9].disconnect()
+        b[5].uninsert("hh")
+        diff = self.assertSameDiff(a[0], b[0])
+        self.assertEqual(
+            {
+                _differences.SectionLengthDifference,
+                _differences.SectionPointDifference,
+                _differences.SectionChildrenDifference,
+                _differences.SegmentMechanismDifference,
+            },
+            set(type(d) for d in diff),
+        )
+
+    def test_bulk_children_order(self):
+        a = _make_cell()
+        b = _make_cell()
+        # Reconnect children in reverse order, they should still be matched.
+        for child in reversed(b[1].children()):
+            child.disconnect()
+            child.connect(b[1])
+        b[3].Ra = 1
+        diff = self.assertSameDiff(a[0], b[0])
+        self.assertEqual(
+            [_differences.SectionAxialResistanceDifference],
+            [type(d) for d in diff if d.differ.left is a[3]],
+        )
+
+    def test_bulk_snapshot(self):
+        a = _make_cell()
+        b = _make_cell()
+        snapshot = Snapshot.capture(a[0])
+        b[6].L = 50
+        b[8].gl_hh = 1
+        self.assertSameDiff(snapshot, Snapshot.capture(b[0]))
+        diff = nrn_diff_bulk(snapshot, b[0])
+        self.assertEqual(diff_keys(nrn_diff(snapshot, b[0])), diff_keys(diff))
+
+    def test_bulk_fallback(self):
+        diff = nrn_diff_bulk(5, True)
+        self.assertIsInstance(diff[0], _differences.TypeIdentityDifference)
+
+    def test_bulk_point_processes(self):
+        a = _make_cell()
+        b = _make_cell()
+        syns = [h.ExpSyn(a[2](0.5)), h.ExpSyn(b[2](0.5))]
+        syns[1].tau = 5
+        diff = self.assertSameDiff(a[0], b[0])
+        self.assertIn(
+            _differences.PointProcessParameterDifference, [type(d) for d in diff]
+        )
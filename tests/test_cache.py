@@ -0,0 +1,78 @@
+import tempfile
+import unittest
+
+from nrndiff import nrn_diff, nrn_diff_models, DiffCache, DiffRecord, Snapshot
+
+from helpers import make_cell, diff_keys
+
+
+class TestDiffCache(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cache = DiffCache(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_cached_diff(self):
+        a = make_cell("ca")
+        b = make_cell("cb")
+        b[4].Ra = 10
+        expected = diff_keys(nrn_diff(a[0], b[0]))
+        self.assertEqual(expected, diff_keys(nrn_diff(a[0], b[0], cache=self.cache)))
+        self.assertEqual((0, 1), (self.cache.hits, self.cache.misses))
+        diffs = nrn_diff(a[0], b[0], cache=self.cache)
+        self.assertEqual(expected, diff_keys(diffs))
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+        ra = next(d for d in diffs if d.name == "SectionAxialResistanceDifference")
+        self.assertEqual((a[4], b[4]), (ra.left, ra.right))
+        # A change is a new fingerprint.
+        b[5](0.5).g_pas = 1
+        diffs = nrn_diff(a[0], b[0], cache=self.cache)
+        self.assertEqual(diff_keys(nrn_diff(a[0], b[0])), diff_keys(diffs))
+        self.assertEqual((1, 2), (self.cache.hits, self.cache.misses))
+
+    def test_cached_models(self):
+        left = make_cell("ml1", 3) + make_cell("ml2", 5)
+        right = make_cell("mr1", 3) + make_cell("mr2", 5)
+        right[5].cm = 2
+        expected = diff_keys(nrn_diff_models(left, right))
+        self.assertEqual(
+            expected, diff_keys(nrn_diff_models(left, right, cache=self.cache))
+        )
+        # Change one cell, the other pair of roots is restored from the cache.
+        right[1].L = 20
+        diffs = nrn_diff_models(left, right, cache=self.cache)
+        self.assertEqual(diff_keys(nrn_diff_models(left, right)), diff_keys(diffs))
+        self.assertEqual((1, 3), (self.cache.hits, self.cache.misses))
+        records = nrn_diff_models(left, right, cache=self.cache, compact=True)
+        self.assertTrue(all(isinstance(r, DiffRecord) for r in records))
+
+    def test_snapshot(self):
+        a = make_cell("sa")
+        b = make_cell("sb")
+        b[2].diam = 3
+        snapshot = Snapshot.capture(a)
+        expected = diff_keys(nrn_diff(snapshot, b))
+        self.assertEqual(expected, diff_keys(nrn_diff(snapshot, b, cache=self.cache)))
+        self.assertEqual(expected, diff_keys(nrn_diff(snapshot, b, cache=self.cache)))
+        self.assertEqual(1, self.cache.hits)
+
+    def test_eviction(self):
+        a = make_cell("ea")
+        b = make_cell("eb")
+        for i in range(3):
+            b[i].Ra = 100 + i
+            nrn_diff(a[0], b[0], cache=self.cache)
+        entries = sorted(self.cache.directory.glob("*.pickle"))
+        self.assertEqual(3, len(entries))
+        size = sum(path.stat().st_size for path in entries)
+        small = DiffCache(self.cache.directory, max_size=size - 1)
+        b[0].Ra = 1
+        nrn_diff(a[0], b[0], cache=small)
+        self.assertLess(
+            sum(path.stat().st_size for path in small.directory.glob("*.pickle")),
+            size,
+        )
+        small.clear()
+        self.assertEqual([], [*small.directory.glob("*.pickle")])
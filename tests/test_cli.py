@@ -0,0 +1,124 @@
+import contextlib
+import io
+import json
+import pathlib
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from neuron import h
+
+from nrndiff import Snapshot
+from nrndiff._cli import main
+
+_SCRIPT = """
+from neuron import h
+secs = [h.Section(name=f"sec{{i}}") for i in range(3)]
+for i, sec in enumerate(secs[1:], start=1):
+    sec.connect(secs[i - 1])
+for sec in secs:
+    sec.insert("pas")
+    sec.Ra = {ra}
+"""
+
+_MOD = """
+NEURON {
+    SUFFIX localmech
+    RANGE g
+}
+PARAMETER {
+    g = 0.5
+}
+"""
+
+_LOCAL_SCRIPT = """
+from neuron import h
+sec = h.Section(name="sec")
+sec.insert("localmech")
+sec.g_localmech = {g}
+"""
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = pathlib.Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def script(self, name, ra):
+        path = self.tmp / name
+        path.write_text(_SCRIPT.format(ra=ra))
+        return str(path)
+
+    def run_cli(self, *args):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            code = main([*args])
+        return code, [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_identical(self):
+        self.assertEqual(
+            (0, []), self.run_cli(self.script("a.py", 100), self.script("b.py", 100))
+        )
+
+    def test_ndjson(self):
+        code, lines = self.run_cli(
+            self.script("a.py", 100),
+            self.script("b.py", 50),
+            "--type",
+            "SectionAxialResistanceDifference",
+            "--max-diffs",
+            "2",
+        )
+        self.assertEqual(1, code)
+        self.assertEqual(2, len(lines))
+        self.assertEqual("SectionAxialResistanceDifference", lines[0]["type"])
+        self.assertEqual([100, 50], lines[0]["values"])
+
+    def test_snapshot_summary(self):
+        secs = [h.Section(name=f"sec{i}") for i in range(3)]
+        for i, sec in enumerate(secs[1:], start=1):
+            sec.connect(secs[i - 1])
+        for sec in secs:
+            sec.insert("pas")
+            sec.Ra = 100
+        Snapshot.capture(secs).save(self.tmp / "snapshot.npz")
+        code, lines = self.run_cli(
+            str(self.tmp / "snapshot.npz"), self.script("b.py", 50), "--summary"
+        )
+        self.assertEqual(1, code)
+        self.assertEqual(
+            [
+                {
+                    "total": 6,
+                    "types": {
+                        "SectionAxialResistanceDifference": 3,
+                        "SegmentInputResistanceDifference": 3,
+                    },
+                }
+            ],
+            lines,
+        )
+
+    def test_error(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            code, _ = self.run_cli(str(self.tmp / "missing.npz"), "other.npz")
+        self.assertEqual(2, code)
+
+    @unittest.skipIf(shutil.which("nrnivmodl") is None, "nrnivmodl not found")
+    def test_local_mechanisms(self):
+        (self.tmp / "localmech.mod").write_text(_MOD)
+        subprocess.run(["nrnivmodl"], cwd=self.tmp, check=True, capture_output=True)
+        scripts = []
+        for name, g in (("a.py", 0.5), ("b.py", 1)):
+            (self.tmp / name).write_text(_LOCAL_SCRIPT.format(g=g))
+            scripts.append(str(self.tmp / name))
+        code, lines = self.run_cli(*scripts)
+        self.assertEqual(1, code)
+        self.assertEqual(
+            [("ParameterDifference", [0.5, 1])],
+            [(line["type"], line["values"]) for line in lines],
+        )
@@ -0,0 +1,114 @@
+import unittest
+
+from neuron import h
+
+from nrndiff import nrn_diff, Connectivity
+from nrndiff import _differences
+
+
+def _make_cell(prefix):
+    soma = h.Section(name=f"{prefix}.soma")
+    dend = h.Section(name=f"{prefix}.dend")
+    dend.connect(soma)
+    syns = [h.ExpSyn(dend(0.5)), h.ExpSyn(dend(0.5)), h.Exp2Syn(dend(0.5))]
+    return [soma, dend], syns
+
+
+def _make_network(prefix):
+    cells = [_make_cell(f"{prefix}{i}") for i in range(3)]
+    stim = h.NetStim()
+    netcons = []
+    for i, (secs, syns) in enumerate(cells):
+        pre = cells[i - 1][0][0]
+        for syn in syns:
+            netcons.append(h.NetCon(pre(0.5)._ref_v, syn, sec=pre))
+        netcons.append(h.NetCon(stim, syns[0]))
+    return cells, stim, netcons
+
+
+class TestConnectivity(unittest.TestCase):
+    def setUp(self):
+        # The NetCons lose their sources and targets when these are garbage collected.
+        self._keep = []
+
+    def network(self, prefix):
+        cells, stim, netcons = _make_network(prefix)
+        self._keep.append((cells, stim))
+        return netcons
+
+    def test_identical(self):
+        left = self.network("ia")
+        right = self.network("ib")
+        self.assertEqual([], nrn_diff(Connectivity(left), Connectivity(right)))
+
+    def test_netcon_diff(self):
+        left = self.network("na")
+        right = self.network("nb")
+        right[1].weight[0] = 2
+        right[6].delay = 5
+        # The threshold is shared by the NetCons of the same source.
+        right[9].threshold = 0
+        diff = nrn_diff(Connectivity(left), Connectivity(right))
+        self.assertEqual(
+            [
+                ("NetConWeightDifference", right[1]),
+                ("NetConDelayDifference", right[6]),
+                ("NetConThresholdDifference", right[8]),
+                ("NetConThresholdDifference", right[9]),
+                ("NetConThresholdDifference", right[10]),
+            ],
+            [(d.name, d.right) for d in diff],
+        )
+        self.assertEqual(([0.0], [2.0]), diff[0].get_values())
+        self.assertEqual((left[1], right[1]), (diff[0].left, diff[0].right))
+
+    def test_added_removed(self):
+        cells, stim, left = _make_network("aa")
+        right = self.network("ab")
+        # Connect a different synapse type, and drop a connection.
+        pre = cells[0][0][0]
+        left.append(h.NetCon(pre(0.5)._ref_v, cells[1][1][2], sec=pre))
+        del right[5]
+        self._keep.append((cells, stim))
+        diff = nrn_diff(Connectivity(left), Connectivity(right))
+        self.assertEqual(1, len(diff))
+        self.assertIsInstance(diff[0], _differences.ConnectionDifference)
+        self.assertEqual(([left[5], left[-1]], []), diff[0].get_values())
+
+    def test_records(self):
+        left = self.network("ra")
+        right = self.network("rb")
+        right[4].weight[0] = 3
+        left, right = Connectivity(left), Connectivity(right)
+        record = nrn_diff(left, right, compact=True)[0]
+        restored = record.to_difference(left, right)
+        self.assertEqual(
+            (left.netcons[4], right.netcons[4]), (restored.left, restored.right)
+        )
+
+
+class TestPointProcessDiff(unittest.TestCase):
+    def test_point_process_diff(self):
+        a, asyns = _make_cell("pa")
+        b, syns = _make_cell("pb")
+        syns[1].tau = 5
+        diff = nrn_diff(a[0], b[0])
+        self.assertEqual(1, len(diff))
+        self.assertIsInstance(diff[0], _differences.PointProcessParameterDifference)
+        self.assertEqual(syns[1], diff[0].right)
+        self.assertEqual(5, diff[0].get_values()[1]["tau"])
+
+    def test_point_process_missing(self):
+        a, asyns = _make_cell("ma")
+        b, bsyns = _make_cell("mb")
+        stim = h.IClamp(b[1](0.5))
+        diff = nrn_diff(a[0], b[0])
+        self.assertEqual(1, len(diff))
+        self.assertIsInstance(diff[0], _differences.SegmentPointProcessDifference)
+        self.assertEqual(
+            (
+                ["Exp2Syn", "ExpSyn", "ExpSyn"],
+                ["Exp2Syn", "ExpSyn", "ExpSyn", "IClamp"],
+            ),
+            diff[0].get_values(),
+        )
@@ -1,5 +1,5 @@
 import unittest
-from nrndiff import nrn_diff
+from nrndiff import nrn_diff, iter_diff
 from nrndiff import _differences
 from neuron import h
 
@@ -74,6 +74,45 @@ class TestSectionDiff(unittest.TestCase):
         diff = nrn_diff(a, b)
         self.assertEqual(1, len(diff), f"diam point difference expected")
 
+    def test_section_point_indices(self):
+        a = h.Section()
+        b = h.Section()
+        for i in range(5):
+            a.pt3dadd(i, 0, 0, 1)
+            b.pt3dadd(i, 0, 0, 1)
+        b.pt3dchange(2, 2.001, 0, 0, 1)
+        b.pt3dadd(5, 0, 0, 1)
+        diff = [
+            d
+            for d in nrn_diff(a, b)
+            if isinstance(d, _differences.SectionPointDifference)
+        ]
+        self.assertEqual(1, len(diff))
+        self.assertEqual([2, 5], diff[0].get_differing_points().tolist())
+        # Points within the tolerance are equal.
+        b.pt3dchange(2, 2 + 1e-9, 0, 0, 1)
+        b.pt3dremove(5)
+        self.assertEqual([], nrn_diff(a, b))
+
+    def test_section_children_order(self):
+        def make_cell(order):
+            root = h.Section(name="order.soma")
+            children = [h.Section(name=f"order.dend{i}") for i in range(3)]
+            for i, child in enumerate(children):
+                child.nseg = i + 1
+                child.L = 10 * (i + 1)
+            for i in order:
+                children[i].connect(root)
+            return root, children
+
+        a, a_children = make_cell([0, 1, 2])
+        b, b_children = make_cell([2, 0, 1])
+        self.assertEqual([], nrn_diff(a, b), "Children should be matched by name")
+        b_children[1].cm = 2
+        diff = nrn_diff(a, b)
+        self.assertEqual(1, len(diff), "Only the changed child should differ")
+        self.assertEqual((a_children[1], b_children[1]), (diff[0].left, diff[0].right))
+
 
 class TestSegmentDiff(unittest.TestCase):
     def test_segment_nodiff(self):
@@ -142,6 +181,16 @@ class TestSegmentDiff(unittest.TestCase):
         diff = nrn_diff(a, b)
         self.assertEqual(0, len(diff), "no diff expected")
 
+    def test_segment_mech_order(self):
+        a = h.Section()
+        a.insert("hh")
+        a.insert("pas")
+        b = h.Section()
+        b.insert("pas")
+        b.insert("hh")
+        diff = nrn_diff(a, b)
+        self.assertEqual(0, len(diff), "insert order should not matter")
+
 
 class TestMechanismDiff(unittest.TestCase):
     def test_mech_nodiff(self):
@@ -188,3 +237,124 @@ class TestParamDiff(unittest.TestCase):
         diff = nrn_diff(ag, bg)
         self.assertEqual(1, len(diff), "diff expected")
         self.assertIsInstance(diff[0], _differences.ParameterDifference)
+
+    def test_array_param_diff(self):
+        a = h.Section()
+        b = h.Section()
+        a.insert("extracellular")
+        b.insert("extracellular")
+        b(0.5).xg[1] = 5
+        diff = nrn_diff(a, b)
+        self.assertEqual(1, len(diff), "array parameter diff expected")
+        self.assertEqual("xg", diff[0].left.name())
+        self.assertEqual([1e9, 5], diff[0].get_values()[1].tolist())
+
+    def test_unsuffixed_param_diff(self):
+        a = h.Section()
+        b = h.Section()
+        a.insert("hh")
+        b.insert("hh")
+        b(0.5).ena = 60
+        diff = nrn_diff(a, b)
+        self.assertEqual(["ena"], [d.left.name() for d in diff])
+
+
+class TestVectorDiff(unittest.TestCase):
+    def test_vector_equal(self):
+        a = h.Vector(range(1000))
+        b = h.Vector(range(1000))
+        b.x[10] += 1e-9
+        self.assertEqual([], nrn_diff(a, b), "Differences within tolerance expected")
+
+    def test_vector_diff(self):
+        a = h.Vector(range(200000))
+        b = h.Vector(range(200000))
+        b.x[150000] = float("nan")
+        b.x[170000] += 5
+        diff = nrn_diff(a, b)
+        self.assertEqual(1, len(diff), "Vector diff expected")
+        self.assertIsInstance(diff[0], _differences.VectorDifference)
+        self.assertEqual(150000, diff[0].get_first_divergence())
+        self.assertEqual(5, diff[0].get_max_error())
+
+    def test_vector_length_diff(self):
+        a = h.Vector(range(10))
+        b = h.Vector(range(12))
+        diff = nrn_diff(a, b)
+        self.assertEqual(10, diff[0].get_first_divergence())
+        self.assertEqual(0, diff[0].get_max_error())
+
+    def test_list_diff(self):
+        a = h.List()
+        b = h.List()
+        a.append(h.Vector(range(5)))
+        b.append(h.Vector(range(1, 6)))
+        b.append(h.Vector())
+        diff = nrn_diff(a, b)
+        self.assertEqual(
+            ["ListLengthDifference", "VectorDifference"], [d.name for d in diff]
+        )
+        self.assertEqual((1, 2), diff[0].get_values())
+        self.assertEqual(0, diff[1].get_first_divergence())
+
+    def test_vector_values_copied(self):
+        a = h.Vector(range(3))
+        b = h.Vector([0, 1, 5])
+        report = nrn_diff(a, b)
+        (record,) = nrn_diff(a, b, compact=True)
+        a.x[0] = 10
+        a.resize(100000)
+        for left, right in (report.values[0], record.values):
+            self.assertEqual([0, 1, 2], left.tolist(), "values should be copies")
+            self.assertEqual([0, 1, 5], right.tolist())
+
+
+class TestIterDiff(unittest.TestCase):
+    def _make_pair(self):
+        a = h.Section()
+        b = h.Section()
+        a.insert("pas")
+        b.insert("pas")
+        a.nseg = b.nseg = 3
+        b.Ra = 10
+        b.g_pas = 1
+        return a, b
+
+    def test_iter_matches_nrn_diff(self):
+        a, b = self._make_pair()
+        self.assertEqual(
+            [(d.name, d.get_labels()) for d in nrn_diff(a, b)],
+            [(d.name, d.get_labels()) for d in iter_diff(a, b)],
+        )
+
+    def test_iter_is_lazy(self):
+        a, b = self._make_pair()
+        diffs = iter_diff(a, b)
+        self.assertIsInstance(next(diffs), _differences.Difference)
+
+    def test_stop_on_first(self):
+        a, b = self._make_pair()
+        self.assertEqual(1, len([*iter_diff(a, b, stop_on_first=True)]))
+        self.assertEqual([], [*iter_diff(h.Section(), h.Section(), stop_on_first=True)])
+
+    def test_max_diffs(self):
+        a, b = self._make_pair()
+        self.assertEqual(2, len([*iter_diff(a, b, max_diffs=2)]))
+        self.assertEqual([], [*iter_diff(a, b, max_diffs=0)])
+
+    def test_type_filter(self):
+        a, b = self._make_pair()
+        diffs = [*iter_diff(a, b, types=_differences.ParameterDifference)]
+        self.assertEqual(3, len(diffs), "g_pas should differ in 3 segments")
+        diffs = [
+            *iter_diff(
+                a,
+                b,
+                types=(
+                    _differences.ParameterDifference,
+                    _differences.SectionAxialResistanceDifference,
+                ),
+                max_diffs=4,
+            )
+        ]
+        self.assertEqual(4, len(diffs))
@@ -0,0 +1,107 @@
+import unittest
+from functools import partial
+
+from neuron import h
+
+from nrndiff import nrn_diff, iter_diff, DigestCache, Snapshot
+from nrndiff import _differs
+
+from helpers import make_cell, diff_keys
+
+_make_cell = partial(make_cell, n=15, points=True)
+
+
+class TestDigest(unittest.TestCase):
+    def test_equal_digests(self):
+        a = _make_cell()
+        b = _make_cell()
+        cache = DigestCache()
+        self.assertEqual(cache.digest(a[0]), cache.digest(b[0]))
+        self.assertEqual(30, len(cache), "both cells should be cached")
+
+    def test_changed_digests(self):
+        a = _make_cell()
+        b = _make_cell()
+        b[14](0.5).g_pas = 1
+        left, right = DigestCache(), DigestCache()
+        # The change should propagate up to the root, but not into other subtrees.
+        for i in (14, 6, 2, 0):
+            self.assertNotEqual(left.digest(a[i]), right.digest(b[i]))
+        for i in (13, 5, 1):
+            self.assertEqual(left.digest(a[i]), right.digest(b[i]))
+
+    def test_point_process_digests(self):
+        a = _make_cell()
+        b = _make_cell()
+        stims = [h.IClamp(a[3](0.5)), h.IClamp(b[3](0.5))]
+        left, right = DigestCache(), DigestCache()
+        self.assertEqual(left.digest(a[0]), right.digest(b[0]))
+        stims[1].amp = 1
+        right.clear()
+        self.assertNotEqual(left.digest(a[0]), right.digest(b[0]))
+        self.assertEqual(
+            diff_keys(nrn_diff(a[0], b[0])), diff_keys(nrn_diff(a[0], b[0], True))
+        )
+
+    def test_snapshot_digest(self):
+        a = _make_cell()
+        cache = DigestCache()
+        self.assertEqual(
+            cache.digest(a[0]), cache.digest(Snapshot.capture(a[0]).roots[0])
+        )
+
+    def test_digest_diff(self):
+        a = _make_cell()
+        b = _make_cell()
+        b[14].g_pas = 1
+        b[3].Ra = 10
+        self.assertEqual(
+            diff_keys(nrn_diff(a[0], b[0])), diff_keys(nrn_diff(a[0], b[0], True))
+        )
+
+    def test_digest_skips_subtrees(self):
+        a = _make_cell()
+        b = _make_cell()
+        b[14].g_pas = 1
+        visited = []
+        init = _differs.SectionDiffer.__init__
+
+        def counting_init(self, left, right, parent):
+            visited.append(left)
+            init(self, left, right, parent)
+
+        _differs.SectionDiffer.__init__ = counting_init
+        try:
+            diffs = [*iter_diff(a[0], b[0], digests=(DigestCache(), None))]
+        finally:
+            _differs.SectionDiffer.__init__ = init
+        self.assertEqual(3, len(diffs), "g_pas diff in 3 segments expected")
+        self.assertEqual(
+            {a[0], a[2], a[6], a[14]}, set(visited), "only changed path visited"
+        )
+
+    def test_identical_roots(self):
+        a = _make_cell()
+        b = _make_cell()
+        cache = DigestCache()
+        cache.digest(a[0])
+        self.assertEqual([], nrn_diff(a[0], b[0], digests=(cache, None)))
+        cache.clear()
+        self.assertEqual(0, len(cache))
+
+    def test_swapped_children(self):
+        # `a` has children x (L=10) and y (L=20), `b` has children y (L=10) and
+        # x (L=20).
+        secs = []
+        for cell, children in (("a", ("x", "y")), ("b", ("y", "x"))):
+            root = h.Section(name=f"{cell}.root")
+            secs.append(root)
+            for name, length in zip(children, (10, 20)):
+                child = h.Section(name=f"{cell}.{name}")
+                child.L = length
+                child.connect(root)
+                secs.append(child)
+        a, b = secs[0], secs[3]
+        expected = diff_keys(nrn_diff(a, b))
+        self.assertEqual(8, len(expected))
+        self.assertEqual(expected, diff_keys(nrn_diff(a, b, digests=True)))
@@ -0,0 +1,55 @@
+import unittest
+from functools import partial
+
+from neuron import h
+
+from nrndiff import nrn_diff, nrn_diff_distributed, CellMap
+from nrndiff import _differences
+
+from helpers import make_cell
+
+_make_cell = partial(make_cell, nseg=1)
+
+
+class TestCellMap(unittest.TestCase):
+    def test_gid_match(self):
+        left = {gid: _make_cell(f"gl{gid}", 3) for gid in (1, 2, 3)}
+        right = {gid: _make_cell(f"gr{gid}", 3) for gid in (2, 3, 4)}
+        right[3][2].cm = 2
+        diff = nrn_diff(
+            CellMap({gid: cell[0] for gid, cell in left.items()}),
+            CellMap({gid: cell[0] for gid, cell in right.items()}),
+        )
+        self.assertEqual(
+            [
+                _differences.GidDifference,
+                _differences.SectionMembraneCapacitanceDifference,
+            ],
+            [type(d) for d in diff],
+        )
+        self.assertEqual(([1], [4]), diff[0].get_values())
+
+
+class TestDistributedDiff(unittest.TestCase):
+    def test_single_rank(self):
+        left = {gid: _make_cell(f"dl{gid}", 5) for gid in range(4)}
+        right = {gid: _make_cell(f"dr{gid}", 5) for gid in range(4)}
+        identical, records = nrn_diff_distributed(left, right)
+        self.assertTrue(identical)
+        self.assertEqual([], records)
+        right[2][4](0.5).g_pas = 1
+        del right[3]
+        identical, records = nrn_diff_distributed(left, right, pc=h.ParallelContext())
+        self.assertFalse(identical)
+        self.assertEqual(
+            [
+                (None, _differences.GidDifference),
+                (2, _differences.ParameterDifference),
+            ],
+            [(gid, record.type) for gid, record in records],
+        )
+        self.assertEqual(([3], []), records[0][1].values)
+        self.assertEqual(
+            ("dl2.sec4(0.5).g_pas", "dr2.sec4(0.5).g_pas"), records[1][1].labels
+        )
+        self.assertEqual(1, records[1][1].values[1])
@@ -0,0 +1,40 @@
+import subprocess
+import sys
+import unittest
+
+from neuron import h
+
+import nrndiff
+from nrndiff import _patches
+
+_CHECK = """
+import sys, nrndiff
+loaded = "neuron" in sys.modules
+from neuron import h
+print(loaded, len(list(h.allsec())))
+"""
+
+
+class TestImport(unittest.TestCase):
+    def test_lazy_import(self):
+        out = subprocess.run(
+            [sys.executable, "-c", _CHECK], check=True, capture_output=True, text=True
+        )
+        self.assertEqual(["False", "0"], out.stdout.split())
+
+    def test_lazy_attributes(self):
+        from nrndiff._models import Model
+
+        self.assertIs(Model, nrndiff.Model)
+        self.assertIn("DiffSession", dir(nrndiff))
+        with self.assertRaises(AttributeError):
+            nrndiff.missing
+
+    def test_patches_applied_once(self):
+        nsec = len(list(h.allsec()))
+        _patches.apply()
+        self.assertEqual(nsec, len(list(h.allsec())))
+        sec = h.Section(name="sec")
+        sec.insert("pas")
+        self.assertEqual(hash(sec(0.5).pas), hash(sec(0.5).pas))
+        self.assertEqual(sec(0.5).pas, sec(0.5).pas)
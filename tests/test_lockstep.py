@@ -0,0 +1,75 @@
+import unittest
+from functools import partial
+
+from neuron import h
+
+from nrndiff import nrn_diff_simulation, Snapshot
+
+from helpers import make_cell
+
+_make_cell = partial(make_cell, n=3, mechanisms=("hh",), chain=True)
+
+
+class TestLockstep(unittest.TestCase):
+    def setUp(self):
+        h.dt = 0.025
+
+    def test_identical(self):
+        a = _make_cell("la")
+        b = _make_cell("lb")
+        self.assertIsNone(nrn_diff_simulation(a, b, 5))
+        self.assertAlmostEqual(5, h.t)
+
+    def test_divergence(self):
+        a = _make_cell("da")
+        b = _make_cell("db")
+        stim = h.IClamp(b[2](0.5))
+        stim.delay = 1
+        stim.dur = 1
+        stim.amp = 1
+        divergence = nrn_diff_simulation(a, b, 5)
+        self.assertIsNotNone(divergence)
+        self.assertGreater(divergence.t, 1)
+        self.assertLess(divergence.t, 1.1)
+        self.assertIn(("da.sec2(0.5).v", "db.sec2(0.5).v"), divergence.labels)
+        self.assertGreater(divergence.max_error, 0)
+
+    def test_interval(self):
+        a = _make_cell("ia")
+        b = _make_cell("ib")
+        stim = h.IClamp(b[0](0.5))
+        stim.delay = 1
+        stim.dur = 1
+        stim.amp = 1
+        divergence = nrn_diff_simulation(a, b, 5, interval=0.5)
+        self.assertAlmostEqual(1.5, divergence.t)
+
+    def test_state_divergence(self):
+        a = _make_cell("sa", n=1)
+        b = _make_cell("sb", n=1)
+        b[0].gnabar_hh = 0.2
+        divergence = nrn_diff_simulation(a, b, 5)
+        self.assertIsNotNone(divergence)
+        self.assertIn(("sa.sec0(0.5).m_hh", "sb.sec0(0.5).m_hh"), divergence.labels)
+
+    def test_v_init(self):
+        a = _make_cell("va")
+        b = _make_cell("vb")
+        if not hasattr(h, "v_init"):
+            nrn_diff_simulation(a, b, 0)
+            self.assertEqual(
+                -65, a[0](0.5).v, "default without the standard run system"
+            )
+        h.load_file("stdrun.hoc")
+        h.v_init = -70
+        self.assertIsNone(nrn_diff_simulation(a, b, 1))
+        nrn_diff_simulation(a, b, 0)
+        self.assertEqual(-70, a[0](0.5).v)
+        self.assertEqual(-70, b[2](0.5).v)
+        nrn_diff_simulation(a, b, 0, v_init=-60)
+        self.assertEqual(-60, a[0](0.5).v)
+
+    def test_snapshot(self):
+        a = _make_cell("na")
+        with self.assertRaises(TypeError):
+            nrn_diff_simulation(Snapshot.capture(a), a, 5)
@@ -0,0 +1,61 @@
+import unittest
+
+from nrndiff import nrn_diff_many, nrn_diff_models, DiffMatrix, Snapshot
+
+from helpers import make_cell
+
+
+class TestDiffMany(unittest.TestCase):
+    def setUp(self):
+        self.reference = make_cell("ref")
+        self.variants = [make_cell(f"var{i}") for i in range(4)]
+        self.variants[0][3].Ra = 10
+        self.variants[2][3].Ra = 20
+        self.variants[2][5](0.5).g_pas = 1
+        self.variants[3][3].Ra = 10
+
+    def test_matrix(self):
+        matrix = nrn_diff_many(self.reference[0], [v[0] for v in self.variants])
+        self.assertIsInstance(matrix, DiffMatrix)
+        self.assertEqual(4, len(matrix))
+        self.assertEqual([1], matrix.identical().tolist())
+        ra = next(
+            i
+            for i, site in enumerate(matrix.sites)
+            if site.name == "SectionAxialResistanceDifference"
+        )
+        self.assertEqual([True, False, True, True], matrix.mask[:, ra].tolist())
+        self.assertEqual(3, matrix.counts()[ra])
+        self.assertEqual(
+            [(35.4, 10), None, (35.4, 20), (35.4, 10)],
+            matrix.values(ra),
+        )
+        self.assertEqual(matrix.values(ra), matrix.values(matrix.sites[ra]))
+        self.assertEqual((matrix.positions >= 0).tolist(), matrix.mask.tolist())
+        param = [site for site in matrix.sites if site.name == "ParameterDifference"]
+        self.assertEqual(1, len(param))
+        self.assertEqual(
+            [False, False, True, False],
+            matrix.mask[:, matrix.sites.index(param[0])].tolist(),
+        )
+
+    def test_matches_nrn_diff(self):
+        matrix = nrn_diff_many(self.reference, self.variants)
+        for variant, records in zip(self.variants, matrix.records):
+            self.assertEqual(
+                sorted(
+                    (d.name, d.get_labels())
+                    for d in nrn_diff_models(self.reference, variant)
+                ),
+                sorted((r.name, r.labels) for r in records),
+            )
+
+    def test_snapshots(self):
+        reference = Snapshot.capture(self.reference)
+        live = nrn_diff_many(self.reference, self.variants)
+        captured = nrn_diff_many(reference, self.variants)
+        self.assertEqual(live.mask.tolist(), captured.mask.tolist())
+        mixed = nrn_diff_many(
+            self.reference, [Snapshot.capture(self.variants[0]), self.variants[0]]
+        )
+        self.assertEqual([[True] * 4] * 2, mixed.mask.tolist())
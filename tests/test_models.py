@@ -0,0 +1,97 @@
+import unittest
+
+from nrndiff import nrn_diff, nrn_diff_models, Model, Snapshot
+from nrndiff import _differences
+from nrndiff._util import match_pairs
+
+from helpers import make_cell
+
+
+def _make_cell(prefix, n):
+    secs = make_cell(prefix, n, mechanisms=())
+    # The root section keeps a single segment.
+    secs[0].nseg = 1
+    return secs
+
+
+class TestMatchPairs(unittest.TestCase):
+    def test_match_pairs(self):
+        pairs, left, right = match_pairs(
+            ["a", "b", "cc", "dd", "e"],
+            ["dd", "xx", "a", "yyy"],
+            [(str, str), (len, len)],
+        )
+        self.assertEqual([("a", "a"), ("dd", "dd"), ("cc", "xx")], pairs)
+        self.assertEqual(["b", "e"], left)
+        self.assertEqual(["yyy"], right)
+
+
+class TestModel(unittest.TestCase):
+    def test_index(self):
+        cells = [_make_cell("idx", 3), _make_cell("idx2", 5)]
+        model = Model([sec for cell in cells for sec in cell])
+        self.assertEqual([cells[0][0], cells[1][0]], model.roots)
+        self.assertEqual((3, 7, 0), model.signature(0))
+        self.assertEqual((5, 13, 0), model.signature(1))
+
+    def test_snapshot_index(self):
+        cells = [_make_cell("snap_idx", 3), _make_cell("snap_idx2", 5)]
+        model = Model(Snapshot.capture([sec for cell in cells for sec in cell]))
+        self.assertEqual(["snap_idx.sec0", "snap_idx2.sec0"], [*map(str, model.roots)])
+        self.assertEqual((5, 13, 0), model.signature(1))
+
+
+class TestModelDiff(unittest.TestCase):
+    def test_models_nodiff(self):
+        left = [_make_cell("l1", 3), _make_cell("l2", 7)]
+        # Build the right model in a different order, with other names.
+        right = [_make_cell("r2", 7), _make_cell("r1", 3)]
+        diff = nrn_diff_models(
+            [sec for cell in left for sec in cell],
+            [sec for cell in right for sec in cell],
+        )
+        self.assertEqual([], diff, "roots should be matched by signature")
+
+    def test_models_diff(self):
+        left = [_make_cell("dl1", 3), _make_cell("dl2", 7), _make_cell("dl3", 2)]
+        right = [_make_cell("dr1", 3), _make_cell("dr2", 7)]
+        right[1][4].Ra = 1
+        diff = nrn_diff_models(
+            [sec for cell in left for sec in cell],
+            [sec for cell in right for sec in cell],
+        )
+        roots = [d for d in diff if isinstance(d, _differences.ModelRootDifference)]
+        self.assertEqual(1, len(roots), "unmatched root expected")
+        self.assertEqual(([left[2][0]], []), roots[0].get_values())
+        ra = [
+            d
+            for d in diff
+            if isinstance(d, _differences.SectionAxialResistanceDifference)
+        ]
+        self.assertEqual(1, len(ra), "Ra diff expected")
+        self.assertEqual((left[1][4], right[1][4]), (ra[0].left, ra[0].right))
+
+    def test_models_snapshot(self):
+        cell = _make_cell("snap", 5)
+        snapshot = Snapshot.capture(cell)
+        cell[2].cm = 3
+        diff = nrn_diff_models(snapshot, cell)
+        self.assertEqual(
+            [_differences.SectionMembraneCapacitanceDifference],
+            [type(d) for d in diff],
+        )
+
+    def test_models_renamed_structure(self):
+        left = _make_cell("Cell[0]", 5)
+        right = _make_cell("Cell[1]", 5)
+        right[1].nseg = 5
+        diff = nrn_diff_models(left, right)
+        self.assertIn(
+            _differences.SectionDiscretizationDifference, [type(d) for d in diff]
+        )
+        self.assertFalse(
+            any(isinstance(d, _differences.ModelRootDifference) for d in diff)
+        )
+        live = nrn_diff(left[0], right[0])
+        snapshot = nrn_diff(Snapshot.capture(left[0]), right[0])
+        self.assertEqual([type(d) for d in live], [type(d) for d in snapshot])
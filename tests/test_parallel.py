@@ -0,0 +1,57 @@
+import pickle
+import unittest
+
+from nrndiff import nrn_diff, nrn_diff_models, nrn_diff_parallel, DiffReport, Snapshot
+from nrndiff import _differences
+from nrndiff._records import DiffRecord
+
+from helpers import make_cell, diff_keys
+
+
+class TestParallelDiff(unittest.TestCase):
+    def test_parallel_nodiff(self):
+        left = [make_cell("pl1", 5), make_cell("pl2", 7)]
+        right = [make_cell("pr1", 5), make_cell("pr2", 7)]
+        self.assertEqual(
+            [],
+            nrn_diff_parallel(
+                [sec for cell in left for sec in cell],
+                [sec for cell in right for sec in cell],
+                max_workers=2,
+            ),
+        )
+
+    def test_parallel_diff(self):
+        left = [make_cell(f"dpl{i}", 5 + i) for i in range(4)]
+        right = [make_cell(f"dpr{i}", 5 + i) for i in range(3)]
+        right[1][3].Ra = 10
+        right[2][6](0.5).g_pas = 1
+        left = Snapshot.capture([sec for cell in left for sec in cell])
+        right = Snapshot.capture([sec for cell in right for sec in cell])
+        expected = nrn_diff_models(left, right)
+        actual = nrn_diff_parallel(left, right, max_workers=2, chunksize=1)
+        self.assertEqual(diff_keys(expected), diff_keys(actual))
+        self.assertIsInstance(actual, DiffReport)
+        self.assertEqual(expected.counts(), actual.counts())
+        ra = [
+            d
+            for d in actual
+            if isinstance(d, _differences.SectionAxialResistanceDifference)
+        ]
+        self.assertEqual(1, len(ra), "Ra diff expected")
+        self.assertEqual(10, ra[0].get_values()[1])
+        self.assertEqual("dpr1.sec3", str(ra[0].right), "should refer to the snapshot")
+
+    def test_record_pickle(self):
+        left = make_cell("rl", 3)
+        right = make_cell("rr", 3)
+        right[2](0.5).g_pas = 1
+        left, right = Snapshot.capture(left), Snapshot.capture(right)
+        diff = nrn_diff(left.roots[0], right.roots[0])
+        records = pickle.loads(
+            pickle.dumps([DiffRecord.from_difference(d) for d in diff])
+        )
+        self.assertEqual(
+            diff_keys(diff),
+            diff_keys(r.to_difference(left.roots[0], right.roots[0]) for r in records),
+        )
@@ -0,0 +1,44 @@
+import pickle
+import unittest
+
+from nrndiff import nrn_diff, nrn_diff_models, DiffRecord, Model
+from nrndiff import _differences
+
+from helpers import make_cell, diff_keys
+
+
+class TestCompactDiff(unittest.TestCase):
+    def test_compact(self):
+        a = make_cell("ca")
+        b = make_cell("cb")
+        b[4].Ra = 10
+        b[6](0.5).g_pas = 1
+        diffs = nrn_diff(a[0], b[0])
+        records = nrn_diff(a[0], b[0], compact=True)
+        self.assertTrue(all(isinstance(r, DiffRecord) for r in records))
+        self.assertEqual(diff_keys(diffs), sorted((r.name, r.labels) for r in records))
+        param = next(r for r in records if r.type is _differences.ParameterDifference)
+        self.assertEqual(1, param.values[1])
+        # Records don't refer to the sections, so they can be pickled.
+        records = pickle.loads(pickle.dumps(records))
+        # Exact values are restored with the records, without going back to NEURON.
+        b[4].Ra = 20
+        restored = DiffRecord.to_differences(records, a[0], b[0])
+        self.assertEqual(diff_keys(diffs), diff_keys(restored))
+        ra = next(
+            d
+            for d in restored
+            if isinstance(d, _differences.SectionAxialResistanceDifference)
+        )
+        self.assertEqual((a[4], b[4]), (ra.left, ra.right))
+        self.assertEqual((a[1], b[1]), (ra.differ.parent.left, ra.differ.parent.right))
+        self.assertTrue(all(r.exact for r in records))
+        self.assertEqual(10, ra.get_values()[1], "values should be the recorded ones")
+
+    def test_compact_models(self):
+        left = make_cell("cml1", 3) + make_cell("cml2", 5)
+        right = make_cell("cmr1", 3) + make_cell("cmr2", 5)
+        right[5].cm = 2
+        records = nrn_diff_models(left, right, compact=True)
+        restored = records[0].to_difference(Model(left), Model(right))
+        self.assertEqual((left[5], right[5]), (restored.left, restored.right))
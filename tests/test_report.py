@@ -0,0 +1,107 @@
+import math
+import unittest
+from functools import partial
+
+from neuron import h
+
+from nrndiff import nrn_diff, nrn_diff_models, DiffReport, Snapshot
+from nrndiff._differences import (
+    ParameterDifference,
+    SectionAxialResistanceDifference,
+    SegmentInputResistanceDifference,
+)
+
+from helpers import make_cell
+
+_make_cell = partial(make_cell, n=5, chain=True)
+
+
+class TestDiffReport(unittest.TestCase):
+    def setUp(self):
+        self.left = _make_cell("a") + _make_cell("b")
+        self.right = _make_cell("a") + _make_cell("b")
+        self.right[1].Ra = 70.8
+        self.right[7].Ra = 17.7
+        self.right[2](0.5).g_pas = 0.002
+        self.report = nrn_diff_models(self.left, self.right)
+
+    def test_report(self):
+        self.assertIsInstance(self.report, DiffReport)
+        self.assertIsInstance(self.report, list)
+        self.assertEqual(
+            {
+                SectionAxialResistanceDifference: 2,
+                SegmentInputResistanceDifference: 6,
+                ParameterDifference: 1,
+            },
+            self.report.counts(),
+        )
+        self.assertEqual(["a.sec0", "b.sec0"], sorted(self.report.keys("cell")))
+        self.assertEqual(self.report.values, [d.get_values() for d in self.report])
+        self.assertIsInstance(nrn_diff(self.left[0], self.left[0]), DiffReport)
+        self.assertEqual("[]", repr(nrn_diff(self.left[0], self.left[0])))
+
+    def test_filter(self):
+        g_pas = self.report.filter(parameter="g_pas")
+        self.assertEqual(["a.sec2"], g_pas.keys("section"))
+        self.assertEqual(["pas"], g_pas.keys("mechanism"))
+        self.assertEqual([0.5], g_pas.x.tolist())
+        ra = self.report.filter(SectionAxialResistanceDifference)
+        self.assertEqual(2, len(ra))
+        self.assertEqual(
+            ra,
+            self.report.filter(
+                "SectionAxialResistanceDifference", cell=["a.sec0", "b.sec0"]
+            ),
+        )
+        self.assertEqual(1, len(ra.filter(cell="b.sec0")))
+        self.assertEqual([], self.report.filter(section="missing"))
+        with self.assertRaises(TypeError):
+            self.report.filter(color="red")
+
+    def test_group_by(self):
+        groups = self.report.group_by("cell")
+        self.assertEqual(5, len(groups["a.sec0"]))
+        self.assertEqual(4, len(groups["b.sec0"]))
+        self.assertTrue(
+            all(
+                isinstance(d, SegmentInputResistanceDifference)
+                for d in groups["b.sec0"].filter(section="b.sec1")
+            )
+        )
+
+    def test_aggregate(self):
+        ra = self.report.filter(SectionAxialResistanceDifference)
+        self.assertAlmostEqual(35.4, ra.filter(cell="a.sec0").deltas()[0])
+        self.assertAlmostEqual(-17.7, ra.filter(cell="b.sec0").deltas()[0])
+        self.assertEqual([-0.5, 1.0], sorted(ra.deltas(relative=True).tolist()))
+        self.assertEqual(
+            {"a.sec0": 35.4, "b.sec0": 17.7},
+            {k: round(v, 6) for k, v in ra.aggregate("cell").items()},
+        )
+        self.assertEqual({"a.sec0": 1, "b.sec0": 1}, ra.aggregate("cell", "count"))
+        counts = self.report.aggregate("type", "count")
+        self.assertEqual(6, counts[SegmentInputResistanceDifference])
+        with self.assertRaises(ValueError):
+            ra.aggregate("cell", "median")
+
+    def test_non_numeric(self):
+        left = h.Section(name="left")
+        right = h.Section(name="right")
+        right.insert("hh")
+        report = nrn_diff(left, right)
+        self.assertTrue(math.isnan(report.deltas()[0]))
+        self.assertEqual({"left": math.nan}.keys(), report.aggregate("cell").keys())
+
+    def test_snapshot(self):
+        report = nrn_diff(
+            Snapshot.capture(self.left[:5]), Snapshot.capture(self.right[:5])
+        )
+        self.assertEqual(["a.sec2"], report.filter(parameter="g_pas").keys("section"))
+        self.assertEqual(["a.sec0"], report.keys("cell"))
+
+    def test_empty(self):
+        report = DiffReport()
+        self.assertEqual({}, report.counts())
+        self.assertEqual({}, report.aggregate("cell"))
+        self.assertEqual([], report.filter(SectionAxialResistanceDifference))
@@ -0,0 +1,101 @@
+import unittest
+
+from neuron import h
+
+from nrndiff import nrn_diff, nrn_diff_models, DiffReport, DiffSession, Snapshot
+
+from helpers import make_cell, diff_keys
+
+
+class TestDiffSession(unittest.TestCase):
+    def test_refresh(self):
+        a = make_cell("ra")
+        b = make_cell("rb")
+        session = DiffSession(a[0], b[0])
+        self.assertEqual([], session.refresh())
+        b[4].Ra = 10
+        report = session.refresh()
+        self.assertIsInstance(report, DiffReport)
+        self.assertEqual(diff_keys(nrn_diff(a[0], b[0])), diff_keys(report))
+        b[6](0.5).g_pas = 1
+        self.assertEqual(diff_keys(nrn_diff(a[0], b[0])), diff_keys(session.refresh()))
+        b[4].Ra = a[4].Ra
+        self.assertEqual(diff_keys(nrn_diff(a[0], b[0])), diff_keys(session.refresh()))
+
+    def test_models(self):
+        left = make_cell("ml1", 3) + make_cell("ml2", 5)
+        right = make_cell("mr1", 3) + make_cell("mr2", 5)
+        session = DiffSession(left, right)
+        self.assertEqual([], session.refresh())
+        self.assertEqual(2, session.walked)
+        right[5].cm = 2
+        self.assertEqual(
+            diff_keys(nrn_diff_models(left, right)), diff_keys(session.refresh())
+        )
+        self.assertEqual(1, session.walked, "only the changed cell should be walked")
+        diffs = session.refresh()
+        self.assertEqual(0, session.walked, "unchanged candidate should not be walked")
+        self.assertEqual(diff_keys(nrn_diff_models(left, right)), diff_keys(diffs))
+
+    def test_structure_change(self):
+        a = make_cell("sa")
+        b = make_cell("sb")
+        session = DiffSession(a, b)
+        session.refresh()
+        b[3].nseg = 5
+        self.assertEqual(diff_keys(nrn_diff_models(a, b)), diff_keys(session.refresh()))
+        # Added sections are tracked when the candidate is the root of a subtree.
+        session = DiffSession(a[0], b[0])
+        session.refresh()
+        extra = h.Section(name="sb.extra")
+        extra.connect(b[6])
+        self.assertEqual(diff_keys(nrn_diff(a[0], b[0])), diff_keys(session.refresh()))
+
+    def test_full_refresh(self):
+        a = make_cell("fa")
+        b = make_cell("fb")
+        session = DiffSession(a[0], b[0])
+        session.refresh()
+        b[2].cm = 2
+        self.assertEqual(
+            diff_keys(nrn_diff(a[0], b[0])), diff_keys(session.refresh(full=True))
+        )
+        self.assertEqual(1, session.walked)
+
+    def test_point_processes(self):
+        a = make_cell("pa")
+        b = make_cell("pb")
+        session = DiffSession(a, b)
+        b[4].Ra = 10
+        session.refresh()
+        syn = h.ExpSyn(b[2](0.5))
+        self.assertEqual(diff_keys(nrn_diff_models(a, b)), diff_keys(session.refresh()))
+        syn.tau = 5
+        self.assertEqual(diff_keys(nrn_diff_models(a, b)), diff_keys(session.refresh()))
+        del syn
+        self.assertEqual(diff_keys(nrn_diff_models(a, b)), diff_keys(session.refresh()))
+
+    def test_mark_changed(self):
+        left = make_cell("kl1", 3) + make_cell("kl2", 5)
+        right = make_cell("kr1", 3) + make_cell("kr2", 5)
+        session = DiffSession(left, right)
+        session.refresh()
+        right[5].cm = 2
+        right[1].L = 50
+        session.mark_changed(right[5])
+        diffs = session.refresh()
+        self.assertEqual(1, session.walked, "only the marked cell should be walked")
+        self.assertEqual(
+            diff_keys(nrn_diff_models(left[3:], right[3:])),
+            diff_keys(diffs),
+            "marks trusted",
+        )
+        # Without marks, the candidate is captured again and all changes are found.
+        self.assertEqual(
+            diff_keys(nrn_diff_models(left, right)), diff_keys(session.refresh())
+        )
+
+    def test_snapshot(self):
+        a = make_cell("na")
+        with self.assertRaises(TypeError):
+            DiffSession(Snapshot.capture(a), a)
@@ -0,0 +1,108 @@
+import tempfile
+import unittest
+import pathlib
+
+import numpy as np
+from neuron import h
+
+from nrndiff import nrn_diff, Snapshot
+from nrndiff import _differences
+
+
+def _make_cell():
+    soma = h.Section(name="soma")
+    dend = h.Section(name="dend")
+    dend.connect(soma)
+    soma.insert("hh")
+    dend.insert("pas")
+    dend.nseg = 3
+    for sec in (soma, dend):
+        sec.pt3dadd(0, 0, 0, 2)
+        sec.pt3dadd(10, 0, 0, 2)
+    return soma, dend
+
+
+class TestSnapshotCapture(unittest.TestCase):
+    def test_capture_columns(self):
+        soma, dend = _make_cell()
+        snapshot = Snapshot.capture(soma)
+        self.assertEqual(2, len(snapshot), "soma subtree has 2 sections")
+        self.assertEqual(["soma", "dend"], [s.name() for s in snapshot.sections])
+        self.assertEqual(4, len(snapshot["seg.x"]), "1 soma + 3 dend segments")
+        self.assertEqual((4, 4), snapshot["pt3d"].shape, "2 points per section")
+        self.assertEqual(1, len(snapshot.roots), "soma should be the only root")
+        self.assertEqual(
+            dend(0.5).g_pas, [*snapshot.sections[1]][1].pas.g, "pas.g captured"
+        )
+
+    def test_snapshot_vs_live_nodiff(self):
+        soma, _ = _make_cell()
+        snapshot = Snapshot.capture(soma)
+        self.assertEqual([], nrn_diff(snapshot, soma), "no diff expected")
+        self.assertEqual([], nrn_diff(soma, snapshot), "no diff expected")
+
+    def test_snapshot_vs_live_diff(self):
+        soma, dend = _make_cell()
+        snapshot = Snapshot.capture(soma)
+        soma.Ra = 20
+        dend.g_pas = 1
+        diff = nrn_diff(snapshot, soma)
+        types = set(type(d) for d in diff)
+        self.assertIn(_differences.SectionAxialResistanceDifference, types)
+        self.assertIn(_differences.ParameterDifference, types)
+        params = [d for d in diff if isinstance(d, _differences.ParameterDifference)]
+        self.assertEqual(3, len(params), "g_pas changed in 3 dend segments")
+        self.assertEqual((0.001, 1), params[0].get_values())
+
+    def test_snapshot_point_processes_warn(self):
+        soma, dend = _make_cell()
+        snapshot = Snapshot.capture(soma)
+        syn = h.ExpSyn(dend(0.5))
+        with self.assertWarns(UserWarning):
+            Snapshot.capture(soma)
+        with self.assertWarns(UserWarning):
+            nrn_diff(snapshot, soma)
+
+    def test_snapshot_array_param(self):
+        sec = h.Section(name="xsec")
+        sec.nseg = 2
+        sec.insert("extracellular")
+        sec.insert("pas")
+        sec(0.75).xraxial[0] = 3
+        snapshot = Snapshot.capture(sec)
+        self.assertEqual([3, 1e9], [*[*snapshot.sections[0]][1].xraxial])
+        self.assertEqual([], nrn_diff(snapshot, sec))
+        sec(0.25).xraxial[1] = 4
+        diff = nrn_diff(snapshot, sec)
+        self.assertEqual(1, len(diff), "array param diff expected")
+        self.assertEqual([1e9, 4], diff[0].get_values()[1].tolist())
+
+    def test_snapshot_children_diff(self):
+        soma, dend = _make_cell()
+        snapshot = Snapshot.capture(soma)
+        dend.disconnect()
+        diff = nrn_diff(snapshot, soma)
+        self.assertIsInstance(diff[0], _differences.SectionChildrenDifference)
+
+
+class TestSnapshotStorage(unittest.TestCase):
+    def test_npz_roundtrip(self):
+        soma, _ = _make_cell()
+        snapshot = Snapshot.capture(soma)
+        with tempfile.TemporaryDirectory() as d:
+            path = pathlib.Path(d) / "model.npz"
+            snapshot.save(path)
+            loaded = Snapshot.load(path)
+            self.assertEqual([], nrn_diff(snapshot, loaded), "roundtrip should match")
+            with self.assertRaises(ValueError):
+                Snapshot.load(path, mmap=True)
+
+    def test_mmap_roundtrip(self):
+        soma, _ = _make_cell()
+        snapshot = Snapshot.capture(soma)
+        with tempfile.TemporaryDirectory() as d:
+            snapshot.save(d)
+            loaded = Snapshot.load(d, mmap=True)
+            self.assertIsInstance(loaded["var.values"], np.memmap)
+            self.assertEqual([], nrn_diff(loaded, soma), "roundtrip should match")
+            del loaded
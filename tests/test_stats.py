@@ -0,0 +1,63 @@
+import unittest
+from functools import partial
+
+from nrndiff import nrn_diff, iter_diff, DiffStats
+
+from helpers import make_cell
+
+_make_cell = partial(make_cell, nseg=1)
+
+
+class TestDiffStats(unittest.TestCase):
+    def test_stats(self):
+        a = _make_cell()
+        b = _make_cell()
+        b[5](0.5).g_pas = 1
+        stats = DiffStats()
+        diff = nrn_diff(a[0], b[0], stats=stats)
+        self.assertEqual(1, len(diff))
+        # 7 sections with 1 segment and 1 mechanism each, whose parameters are compared
+        # by the mechanism differ.
+        self.assertEqual(21, stats.nodes)
+        self.assertEqual(
+            {
+                "SectionDiffer": 7,
+                "SegmentDiffer": 7,
+                "MechanismDiffer": 7,
+            },
+            dict(stats.differ_counts),
+        )
+        self.assertEqual(1, stats.difference_counts["ParameterDifference"])
+        self.assertEqual(21, stats.difference_counts["TypeIdentityDifference"])
+        self.assertEqual(42, stats.memo_size)
+        # Root, child and grandchild sections, and the segment and mechanism below.
+        self.assertEqual(5, stats.max_depth)
+        self.assertGreater(stats.max_stack_size, 0)
+        self.assertGreater(stats.hash_time, 0)
+        self.assertEqual(0, stats.digest_time)
+        self.assertGreater(stats.time, 0)
+        self.assertGreater(stats.gc_time, 0)
+        self.assertEqual(stats.nodes, stats.as_dict()["nodes"])
+
+    def test_digest_time(self):
+        a = _make_cell()
+        b = _make_cell()
+        stats = DiffStats()
+        self.assertEqual([], nrn_diff(a[0], b[0], digests=True, stats=stats))
+        self.assertEqual(0, stats.nodes)
+        self.assertGreater(stats.digest_time, 0)
+
+    def test_hooks(self):
+        a = _make_cell(n=3)
+        b = _make_cell(n=3)
+        entered = []
+        exited = []
+        stats = DiffStats(
+            on_enter=lambda left, right, parent: entered.append(left),
+            on_exit=lambda left, right, differ, diffs: exited.append(left),
+        )
+        diffs = [*iter_diff(a[0], b[0], stats=stats)]
+        self.assertEqual([], diffs)
+        self.assertEqual(a[0], entered[0], "first node should be entered first")
+        self.assertEqual(entered, exited)
+        self.assertEqual(stats.nodes, len(entered))